@@ -0,0 +1,62 @@
+"""Talking to a running ``dabble serve`` daemon
+
+This is on the path of every command-line run, so it sticks to the stdlib and
+doesn't import the interpreter.
+
+"""
+import json
+from os import environ, getuid, stat
+from os.path import join
+import socket
+from tempfile import gettempdir
+
+
+def default_socket_path():
+    """Return where the daemon listens unless told otherwise: $DABBLE_SOCKET,
+    else a socket in $XDG_RUNTIME_DIR, which only we can write to, falling
+    back to a per-user socket in the temp dir."""
+    if environ.get('DABBLE_SOCKET'):
+        return environ['DABBLE_SOCKET']
+    if environ.get('XDG_RUNTIME_DIR'):
+        return join(environ['XDG_RUNTIME_DIR'], 'dabble.sock')
+    return join(gettempdir(), f'dabble-{getuid()}.sock')
+
+
+class DaemonUnavailable(Exception):
+    """There's no daemon of ours listening on the socket, or it died before
+    answering."""
+
+
+def request(socket_path, path=None, source=None):
+    """Ask the daemon to run a program, and return its response.
+
+    Pass either the absolute ``path`` of a program file or its ``source``.
+
+    :return: A dict with either a ``result`` key, holding the str() of the
+        program's value, or an ``error`` key, holding a description of what went
+        wrong
+    :raise DaemonUnavailable: if nobody is listening, the socket belongs to
+        another user, or the daemon hangs up without answering
+
+    """
+    try:
+        owner = stat(socket_path).st_uid
+    except FileNotFoundError as exc:
+        raise DaemonUnavailable(socket_path) from exc
+    if owner != getuid():
+        # Somebody else could have made it first, say in a shared temp dir.
+        # Don't trust them with our program or believe its output from them.
+        raise DaemonUnavailable(f'{socket_path} belongs to another user.')
+
+    message = {'path': path} if source is None else {'source': source}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(message).encode() + b'\n')
+            with sock.makefile('rb') as file:
+                response = file.readline()
+        except (FileNotFoundError, ConnectionError) as exc:
+            raise DaemonUnavailable(socket_path) from exc
+    if not response:
+        raise DaemonUnavailable(f'The daemon on {socket_path} hung up without answering.')
+    return json.loads(response)
@@ -1,8 +1,105 @@
-from sys import argv
+from argparse import ArgumentParser
+from os.path import abspath
+import sys
 
-from .interpreter import run
+from .client import DaemonUnavailable, default_socket_path, request
 
 
-def main():
-    with open(argv[1], 'r') as file:
-        print(run(file.read()))
+def main(argv=None):
+    """Run a Dabble program, or, as ``dabble serve``, be the daemon that runs
+    them.
+
+    If a daemon is listening, hand the program to it and skip importing the
+    interpreter at all; otherwise, run it here.
+
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['serve']:
+        return _serve(argv[1:])
+
+    parser = ArgumentParser(prog='dabble', description='Run a Dabble program.')
+    parser.add_argument('program', help='path to the program')
+    parser.add_argument('--socket', default=default_socket_path(),
+                        help='where to look for a `dabble serve` daemon')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='run in this process even if a daemon is up')
+    parser.add_argument('--from-snapshot', metavar='PATH',
+                        help='start from the top-level env saved in a snapshot')
+    parser.add_argument('--save-snapshot', metavar='PATH',
+                        help="save the program's top-level env when it's done")
+    parser.add_argument('--no-inline', action='store_true',
+                        help="don't inline calls to small functions, for debugging")
+    parser.add_argument('--inline-stats', action='store_true',
+                        help='report what got inlined to stderr')
+    parser.add_argument('--memprofile', action='store_true',
+                        help='report what allocates memory to stderr')
+    parser.add_argument('--transpile', action='store_true',
+                        help='run by way of Python source translated from the program')
+    parser.add_argument('--transpile-cache', metavar='DIR',
+                        help='like --transpile, keeping the translations in DIR for next time')
+    args = parser.parse_args(argv)
+
+    # The daemon gives each run a clean env, so snapshots mean running here.
+    # It also has its own optimization settings and doesn't transpile, and
+    # profiling it would measure the daemon rather than the program.
+    if not (args.no_daemon or args.from_snapshot or args.save_snapshot or
+            args.no_inline or args.inline_stats or args.memprofile or
+            args.transpile or args.transpile_cache):
+        try:
+            response = request(args.socket, path=abspath(args.program))
+        except DaemonUnavailable:
+            pass
+        else:
+            if 'error' in response:
+                sys.exit(response['error'])
+            print(response['result'])
+            return
+
+    # Import lazily so thin-client runs don't pay for it:
+    from . import inliner, transpiler
+    from .environment import Environment
+    from .exceptions import SnapshotError
+    from .interpreter import pervasives, run
+    from .memprofile import profile
+    from .snapshot import restore, save
+
+    if args.no_inline:
+        inliner.enabled = False
+    if args.from_snapshot:
+        try:
+            env = restore(args.from_snapshot)
+        except SnapshotError as exc:
+            sys.exit(str(exc))
+    else:
+        env = Environment(parent=pervasives)
+    with open(args.program, 'r') as file:
+        program = file.read()
+    if args.memprofile:
+        result, report = profile(program, env)
+        print(result)
+        print(report, file=sys.stderr)
+    elif args.transpile or args.transpile_cache:
+        print(transpiler.run(program, env, cache_dir=args.transpile_cache))
+    else:
+        print(run(program, env))
+    if args.save_snapshot:
+        try:
+            save(env, args.save_snapshot)
+        except SnapshotError as exc:
+            sys.exit(str(exc))
+    if args.inline_stats:
+        print(inliner.stats, file=sys.stderr)
+
+
+def _serve(argv):
+    parser = ArgumentParser(prog='dabble serve',
+                            description='Keep an interpreter warm, and run programs sent over a Unix socket.')
+    parser.add_argument('--socket', default=default_socket_path(),
+                        help='path of the socket to listen on')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='how many requests to run at once')
+    args = parser.parse_args(argv)
+
+    from .daemon import serve
+
+    serve(args.socket, workers=args.workers)
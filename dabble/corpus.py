@@ -0,0 +1,140 @@
+"""A generator of big, valid Dabble sources for exercising the front end
+
+Each of the lexer's indentation rules costs differently, so the knobs here
+control how much of each a corpus has: how deep blocks nest (and so how far
+full outdents fall), how long lines are, how many lines are skipped comments or
+blank, how many indents are tabs rather than spaces, how much text sits inside
+multi-line parens where indentation is ignored, and how often blocks are
+continued after a partial outdent.
+
+The output depends only on the seed and the knobs, so benchmark runs are
+comparable.
+
+"""
+from io import StringIO
+from random import Random
+
+
+WORDS = ['set', 'fun', 'if', 'while', 'begin', 'x', 'y', 'counter', 'total',
+         'make-adder', 'on-click', 'callback', 'factorial', '+', '-', '*',
+         '/', '<', '>', '<=', '>=', '==']
+
+# Indents are made by stacking these. The longer ones leave room for partial
+# outdents.
+SPACE_UNITS = ['  ', '    ']
+TAB_UNITS = ['\t', '\t\t']
+
+
+def generate(file, size, seed=0, max_depth=6, line_width=60,
+             comment_share=0.1, tab_share=0.25, paren_share=0.05,
+             partial_share=0.1):
+    """Write at least `size` bytes (and not much more) of valid Dabble source
+    to a text file.
+
+    :arg max_depth: How deep blocks may nest. Each top-level statement nests to
+        a depth picked evenly from 0 through this.
+    :arg line_width: About how many characters of code go on a line, not
+        counting indentation
+    :arg comment_share: The fraction of lines that are comments or blank
+    :arg tab_share: The fraction of indents that are tabs rather than spaces
+    :arg paren_share: The fraction of lines that open a parenthesized region
+        running over the next few lines
+    :arg partial_share: The chance that a block of 2-character-or-wider indent
+        is followed by a partial outdent and a second block, like an ``else``
+
+    """
+    writer = _Writer(Random(seed), max_depth, line_width, comment_share,
+                     tab_share, paren_share, partial_share)
+    written = 0
+    while written < size:
+        for line in writer.statement('', 0, writer.rng.randint(0, max_depth)):
+            file.write(line)
+            written += len(line)
+
+
+def corpus(size, **kwargs):
+    """Return a string of at least `size` characters of valid Dabble source.
+
+    Takes the same keyword args as ``generate()``.
+
+    """
+    file = StringIO()
+    generate(file, size, **kwargs)
+    return file.getvalue()
+
+
+class _Writer:
+    def __init__(self, rng, max_depth, line_width, comment_share, tab_share,
+                 paren_share, partial_share):
+        self.rng = rng
+        self.max_depth = max_depth
+        self.line_width = line_width
+        self.comment_share = comment_share
+        self.tab_share = tab_share
+        self.paren_share = paren_share
+        self.partial_share = partial_share
+
+    def statement(self, indent, depth, target_depth):
+        """Yield the lines of a statement and its nested blocks, which reach
+        down to `target_depth`."""
+        yield from self.skipped_lines()
+        yield from self.code_lines(indent)
+        if depth >= target_depth:
+            return
+        unit = self.indent_unit()
+        yield from self.block(indent + unit, depth + 1, target_depth)
+        if len(unit) >= 2 and self.rng.random() < self.partial_share:
+            # Partially outdent, as for an `else`, then indent back in:
+            partial = indent + unit[:self.rng.randint(1, len(unit) - 1)]
+            yield from self.code_lines(partial)
+            yield from self.block(indent + unit, depth + 1, target_depth)
+
+    def block(self, indent, depth, target_depth):
+        """Yield the lines of a few sibling statements, one of which reaches
+        down to `target_depth`."""
+        count = self.rng.randint(1, 3)
+        deep_one = self.rng.randrange(count)
+        for i in range(count):
+            yield from self.statement(indent, depth,
+                                      target_depth if i == deep_one else depth)
+
+    def skipped_lines(self):
+        """Yield any comments and blank lines due before the next line of
+        code."""
+        while self.rng.random() < self.comment_share:
+            indent = self.random_whitespace()
+            if self.rng.random() < 0.5:
+                yield f'{indent}# {self.words()}\n'
+            else:
+                yield f'{indent}\n'
+
+    def code_lines(self, indent):
+        """Yield a line of code and, if it opens a paren region, the lines that
+        region spills onto."""
+        if self.rng.random() >= self.paren_share:
+            yield f'{indent}{self.words()}\n'
+            return
+        yield f'{indent}{self.words()} ({self.words()}\n'
+        for _ in range(self.rng.randint(0, 3)):
+            # Indentation counts for nothing in here, so make a mess of it:
+            yield f'{self.random_whitespace()}{self.words()}\n'
+        yield f'{self.random_whitespace()}{self.words()}) {self.words()}\n'
+
+    def words(self):
+        """Return a run of words and ints about `line_width` characters
+        long."""
+        tokens = []
+        length = -1
+        while length < self.line_width:
+            token = (str(self.rng.randrange(100000)) if self.rng.random() < 0.2
+                     else self.rng.choice(WORDS))
+            tokens.append(token)
+            length += len(token) + 1
+        return ' '.join(tokens)
+
+    def indent_unit(self):
+        units = TAB_UNITS if self.rng.random() < self.tab_share else SPACE_UNITS
+        return self.rng.choice(units)
+
+    def random_whitespace(self):
+        return ''.join(self.rng.choice(' \t') for _ in range(self.rng.randint(0, 8)))
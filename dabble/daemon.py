@@ -0,0 +1,106 @@
+"""A long-running process that keeps the interpreter warm and runs programs
+sent to it over a Unix domain socket
+
+The protocol is one JSON object per line: the client sends a request (see
+``client.request()``) and gets a response back, then the connection closes.
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import json
+from os import chmod, unlink
+from os.path import exists
+import socket
+from socketserver import StreamRequestHandler, UnixStreamServer
+
+from .environment import Environment
+from .indent_parser import lex, parse
+from .interpreter import optimized, pervasives, run_parsed
+
+
+@lru_cache(maxsize=256)
+def parsed(source):
+    """Return the optimized parse tree of a program, reusing it if we've seen
+    the same source lately."""
+    return optimized(parse(lex(source)))
+
+
+def execute(message):
+    """Run the program a request describes, and return the response.
+
+    Each run gets a fresh top-level env, so nothing leaks between requests.
+
+    """
+    try:
+        source = message.get('source')
+        if source is None:
+            with open(message['path'], 'r') as file:
+                source = file.read()
+        result = run_parsed(parsed(source), Environment(parent=pervasives))
+    except Exception as exc:
+        return {'error': f'{type(exc).__name__}: {exc}'}
+    return {'result': str(result)}
+
+
+class _Handler(StreamRequestHandler):
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline())
+        except ValueError as exc:
+            response = {'error': f'Malformed request: {exc}'}
+        else:
+            response = execute(message)
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+class Server(UnixStreamServer):
+    """A Unix-socket server that handles each connection on a fixed-size pool
+    of worker threads"""
+
+    def __init__(self, socket_path, workers=8):
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _Handler)
+        # Anyone who can connect can run code as us:
+        chmod(socket_path, 0o600)
+        self.socket_path = socket_path
+        self.pool = ThreadPoolExecutor(workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+        if exists(self.socket_path):
+            unlink(self.socket_path)
+
+
+def _remove_stale_socket(socket_path):
+    """Clear away a socket file left behind by a daemon that died, but refuse
+    to stomp on one that's still running."""
+    if not exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except ConnectionRefusedError:
+            unlink(socket_path)
+        else:
+            raise OSError(f'A daemon is already listening on {socket_path}.')
+
+
+def serve(socket_path, workers=8):
+    """Serve requests until interrupted."""
+    with Server(socket_path, workers) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -2,6 +2,14 @@ class Environment:
     """A mapping of variables to values. Basically, a scope. They can point to
     parent scopes."""
 
+    #: Names whose binding anywhere we keep track of, so code specialized for
+    #: their pervasive values knows when to stop trusting them
+    watched = frozenset()
+
+    #: Watched names that have been bound, since they were watched, in an env
+    #: with no parent, like the pervasives. Every program sees those.
+    rebound = set()
+
     def __init__(self, vars=None, parent=None):
         """
         :arg vars: A dict of variable names pointing to their values
@@ -9,6 +17,16 @@ class Environment:
         """
         self.vars = vars or {}
         self.parent = parent
+        #: Watched names bound in this env or any other in its tree: those
+        #: descending from the same child of a parentless env, like a
+        #: program's top-level env. Any env we look names up through is in
+        #: here, but one program's rebindings don't touch another's, say in
+        #: the daemon.
+        if parent is None or parent.parent is None:
+            self.tree_rebound = set()
+        else:
+            self.tree_rebound = parent.tree_rebound
+        self._note_bindings(self.vars)
 
     def look_up(self, name):
         """Return the value of a var in this scope or the nearest parent one
@@ -17,9 +35,24 @@ class Environment:
 
     def assign(self, name, value):
         """Set a var, new or existing, to a value."""
+        if name in self.watched:
+            self._note_bindings((name,))
         self.vars[name] = value
         return value
 
+    def _note_bindings(self, names):
+        if not self.watched.isdisjoint(names):
+            bound = self.watched.intersection(names)
+            if self.parent is None:
+                Environment.rebound.update(bound)
+            else:
+                self.tree_rebound.update(bound)
+
+    def __setstate__(self, state):
+        # Unpickling doesn't go through __init__, but we still need to know.
+        self.__dict__.update(state)
+        self._note_bindings(self.vars)
+
     def _env_where_bound(self, name):
         """Return the innermost environment from the scope chain (starting at
         myself) where var `name` is bound."""
@@ -1,2 +1,10 @@
 class LexError(Exception):
     """An error during tokenization"""
+
+
+class TranspileError(Exception):
+    """A program that can't be faithfully translated to Python"""
+
+
+class SnapshotError(Exception):
+    """A file that isn't a snapshot we can restore"""
@@ -0,0 +1,214 @@
+"""A throughput benchmark for the lexer and parser on big generated sources
+
+Run it as ``python -m dabble.frontend_bench``; pass ``--help`` for the knobs.
+For each corpus size, it reports tokens/sec, MB/sec, and peak memory for
+``lex()`` and ``parse()`` separately.
+
+A parse tree takes about 8 times the memory of its source, so a corpus of
+gigabytes can't be parsed in one go. Instead, we stream the corpus from disk in
+pieces of about a megabyte, split between top-level statements, and lex and
+parse each on its own, throwing the tree away. Memory use is bounded by the
+piece size, not the corpus size, and the peaks we report are those of the
+biggest piece. Parsing pulls tokens from the lexer as it goes, so we time lexing
+alone and lexing plus parsing, and take the difference as parse time.
+
+Peak memory is measured in a separate pass under tracemalloc, which slows
+things too much to time at the same time. ``--no-memory`` skips that pass,
+which is handy for the biggest corpora.
+
+"""
+from argparse import ArgumentParser
+from hashlib import sha256
+from os import makedirs, replace
+from os.path import exists, getsize, join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import tracemalloc
+
+from .corpus import generate
+from .indent_parser import lex, parse
+
+
+MB = 1024 * 1024
+
+UNITS = {'': 1, 'K': 1024, 'M': MB, 'G': 1024 * MB}
+
+
+def measure(path, repeat=3, memory=True, piece_size=MB):
+    """Benchmark lexing and parsing a generated corpus.
+
+    :arg path: The path of a file written by ``corpus.generate()``
+    :arg repeat: How many times to time each, keeping the fastest
+    :arg piece_size: About how many characters to lex and parse at a time
+    :return: A dict of bytes, tokens, and, for each of lex and parse, the
+        fastest time in seconds and the peak memory in bytes (or None if not
+        measured)
+
+    """
+    lex_seconds = min(_timed(_lex, path, piece_size) for _ in range(repeat))
+    both_seconds = min(_timed(_lex_and_parse, path, piece_size) for _ in range(repeat))
+    results = {'bytes': getsize(path),
+               'tokens': sum(_lex(piece) for piece in pieces(path, piece_size)),
+               'lex_seconds': lex_seconds,
+               'parse_seconds': max(0, both_seconds - lex_seconds),
+               'lex_peak': None,
+               'parse_peak': None}
+    if memory:
+        results['lex_peak'] = _peak(_lex, path, piece_size)
+        results['parse_peak'] = _peak(_lex_and_parse, path, piece_size)
+    return results
+
+
+def pieces(path, piece_size):
+    """Yield the text of a generated corpus in pieces of at least
+    `piece_size` characters (but for the last), each starting at a top-level
+    statement, so it lexes and parses on its own.
+
+    We find those starts by their lack of indentation, which works for
+    generated corpora, with their parens-free comments, but not for Dabble in
+    general.
+
+    """
+    with open(path) as file:
+        piece = []
+        length = 0
+        depth = 0  # of parens
+        for line in file:
+            if length >= piece_size and depth == 0 and line[:1] not in ' \t#\n':
+                yield ''.join(piece)
+                piece = []
+                length = 0
+            piece.append(line)
+            length += len(line)
+            depth += line.count('(') - line.count(')')
+        if piece:
+            yield ''.join(piece)
+
+
+def _lex(text):
+    """Lex some text, and return how many tokens it has."""
+    count = 0
+    for _ in lex(text):
+        count += 1
+    return count
+
+
+def _lex_and_parse(text):
+    parse(lex(text))
+
+
+def _timed(function, path, piece_size):
+    """Return how long a function takes to run over all the pieces of a
+    corpus, not counting reading them."""
+    seconds = 0
+    for piece in pieces(path, piece_size):
+        start = perf_counter()
+        function(piece)
+        seconds += perf_counter() - start
+    return seconds
+
+
+def _peak(function, path, piece_size):
+    """Return how far above its starting point traced memory gets while a
+    function runs on any one piece of a corpus."""
+    tracemalloc.start()
+    try:
+        peak = 0
+        for piece in pieces(path, piece_size):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            function(piece)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+        return peak
+    finally:
+        tracemalloc.stop()
+
+
+def parse_size(text):
+    """Turn a size like "10K", "5M", or "1G" into a number of bytes."""
+    text = text.strip().upper().rstrip('B')
+    unit = text[-1:] if text[-1:] in UNITS else ''
+    return int(float(text[:len(text) - len(unit)]) * UNITS[unit])
+
+
+def format_results(results):
+    """Return a table, one row per dict from ``measure()``."""
+    row = '{:>12} {:>12} {:>14} {:>10} {:>12} {:>14} {:>10} {:>12}'
+    lines = [row.format('bytes', 'tokens',
+                        'lex tokens/s', 'lex MB/s', 'lex peak',
+                        'parse tokens/s', 'parse MB/s', 'parse peak')]
+    for r in results:
+        columns = [r['bytes'], r['tokens']]
+        for stage in ('lex', 'parse'):
+            seconds = r[f'{stage}_seconds'] or float('inf')
+            peak = r[f'{stage}_peak']
+            columns += [f'{r["tokens"] / seconds:,.0f}',
+                        f'{r["bytes"] / MB / seconds:.2f}',
+                        '-' if peak is None else f'{peak / 1024:,.0f} KB']
+        lines.append(row.format(*columns))
+    return '\n'.join(lines)
+
+
+def _corpus_file(directory, size, **knobs):
+    """Return the path of a corpus, generating it into a dir only if it isn't
+    there already. Big ones take a while to make."""
+    key = sha256(repr((size, sorted(knobs.items()))).encode()).hexdigest()[:16]
+    path = join(directory, f'corpus-{key}.dab')
+    if not exists(path):
+        makedirs(directory, exist_ok=True)
+        with open(path + '.tmp', 'w') as file:
+            generate(file, size, **knobs)
+        # Rename only once complete, so an interrupted run isn't mistaken
+        # for a finished corpus:
+        replace(path + '.tmp', path)
+    return path
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog='python -m dabble.frontend_bench',
+                            description='Benchmark the lexer and parser on generated sources.')
+    parser.add_argument('--sizes', nargs='+', default=['10K', '1M', '10M'],
+                        help='corpus sizes, like 10K, 5M, or 1G')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-depth', type=int, default=6,
+                        help='deepest block nesting')
+    parser.add_argument('--line-width', type=int, default=60,
+                        help='characters of code per line')
+    parser.add_argument('--comment-share', type=float, default=0.1,
+                        help='fraction of lines that are comments or blank')
+    parser.add_argument('--tab-share', type=float, default=0.25,
+                        help='fraction of indents made of tabs')
+    parser.add_argument('--paren-share', type=float, default=0.05,
+                        help='fraction of lines opening a multi-line paren region')
+    parser.add_argument('--partial-share', type=float, default=0.1,
+                        help='chance of a partial outdent after a block')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timing runs per stage, keeping the fastest')
+    parser.add_argument('--no-memory', action='store_true',
+                        help="don't measure peak memory")
+    parser.add_argument('--piece-size', default='1M',
+                        help='how much of a corpus to lex and parse at a time')
+    parser.add_argument('--corpus-dir',
+                        help='keep generated corpora here and reuse them')
+    args = parser.parse_args(argv)
+
+    knobs = dict(seed=args.seed,
+                 max_depth=args.max_depth,
+                 line_width=args.line_width,
+                 comment_share=args.comment_share,
+                 tab_share=args.tab_share,
+                 paren_share=args.paren_share,
+                 partial_share=args.partial_share)
+    results = []
+    with TemporaryDirectory() as temp_dir:
+        for size in args.sizes:
+            path = _corpus_file(args.corpus_dir or temp_dir, parse_size(size), **knobs)
+            results.append(measure(path,
+                                   repeat=args.repeat,
+                                   memory=not args.no_memory,
+                                   piece_size=parse_size(args.piece_size)))
+    print(format_results(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -34,7 +34,7 @@ OPEN = TokenConst('OPEN')
 CLOSE = TokenConst('CLOSE')
 
 
-def lex(text):
+def lex(text, current_line=None):
     """Break down a string into an iterable of tokens based on indentation in a
     scheme akin to the I-expressions presented in SRFI 49.
 
@@ -60,6 +60,10 @@ def lex(text):
     * Indentation is ignored inside parens so you can use whitespace for human
       comprehension in non-machine-readable ways.
 
+    :arg current_line: A 1-list, if you want to know where tokens come from.
+        We keep its item set to the number of the line we're on, which is the
+        line of the token most recently yielded.
+
     """
     old_indent = None
     # A stack of lengths of indents of indentation-based lists that enclose this
@@ -72,6 +76,8 @@ def lex(text):
     for match in token_pattern.finditer(text):
         type = match.lastgroup
         if type == 'dent':
+            if current_line is not None:
+                current_line[0] += 1
             if enclosing_parens <= 0:  # Ignore indentation inside parens.
                 new_indent = match.group('dent')
                 if not at:  # BOF
@@ -128,6 +134,9 @@ def lex(text):
             yield match.group()
         elif type == 'unmatched':
             raise LexError('Unrecognized token: "%s".' % match.group())
+        elif type == 'skipped_line':
+            if current_line is not None:
+                current_line[0] += 1
 
     did_any = False
     for indent in at:
@@ -138,11 +147,19 @@ def lex(text):
     
 
 
-def _parse_list(token_iter, return_at):
+def _parse_list(token_iter, return_at, lines=None):
     """Start parsing the token stream at a list OPEN, either OPEN or '('.
     Parse until we reach the matching CLOSE, then return the parsed list plus a
     bool representing whether we collapsed the list from a 1-list to an atom
-    (and thus it shouldn't be collapsed further)."""
+    (and thus it shouldn't be collapsed further).
+
+    :arg lines: None or a tuple of the ``current_line`` passed to ``lex()`` and
+        a dict in which to record the line each list we return starts on
+
+    """
+    if lines is not None:
+        current_line, list_lines = lines
+        start_line = current_line[0]
     ret = []
     wrong_closer = ')' if return_at is CLOSE else CLOSE
     # Whether we already collapsed the single list inside ``ret`` to an atom:
@@ -155,7 +172,7 @@ def _parse_list(token_iter, return_at):
     for token in token_iter:
         if token in (OPEN, '('):
             awaited_closer = CLOSE if token is OPEN else ')'
-            l, collapsed, last_included_list_was_made_with_parens = _parse_list(token_iter, awaited_closer)
+            l, collapsed, last_included_list_was_made_with_parens = _parse_list(token_iter, awaited_closer, lines)
             ret.append(l)
         elif token == return_at:
             # A single atom on a line is just the atom, not a 1-list of it:
@@ -164,6 +181,8 @@ def _parse_list(token_iter, return_at):
                 # OPEN, expression, CLOSE. Collapse the list: shuck off one
                 # layer of opens and closes.
                 return ret[0], True, False
+            if lines is not None:
+                list_lines[id(ret)] = start_line
             return ret, False, (return_at == ')')
         elif token == wrong_closer:
             # Superfluous end parentheses (that is, missing dedents) are caught
@@ -175,7 +194,7 @@ def _parse_list(token_iter, return_at):
     raise RuntimeError("Should never get here. We should always return by encountering a CLOSE or end parenthesis. Well-formedness should be checked by the lexer and the LexError returned just above.")
 
 
-def parse(tokens):
+def parse(tokens, current_line=None, list_lines=None):
     """Turn the token stream from the lexer into a parse tree.
 
     parse() won't work unless the stream starts with an OPEN and ends with a
@@ -185,6 +204,10 @@ def parse(tokens):
     atom = int | word
     list = (OPEN expr* CLOSE) | ('(' expr* ')')
 
+    To find out where lists came from, pass the ``current_line`` you passed to
+    ``lex()`` and a dict as ``list_lines``. We'll fill it in with the line
+    number each list starts on, keyed by the list's id().
+
     """
     token_iter = iter(tokens)
 
@@ -192,6 +215,7 @@ def parse(tokens):
     # implicitly makes. It'll still happily match and consume the ending CLOSE.
     assert next(token_iter) is OPEN
 
-    l, _, _ = _parse_list(token_iter, CLOSE)
+    lines = None if list_lines is None else (current_line, list_lines)
+    l, _, _ = _parse_list(token_iter, CLOSE, lines)
     return l
     # TODO: Throw a fit if there are leftover tokens, meaning we prematurely closed all enclosers.
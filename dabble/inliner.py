@@ -0,0 +1,207 @@
+"""An optimization pass that inlines calls to small, non-recursive functions
+
+Calling a user function means evaluating the callee, building an args list,
+making an activation env, and re-entering eval(). For a helper like ``square``,
+that dwarfs the work of its body. So, before we run a program, we replace calls
+to such helpers with their bodies, params filled in with the args.
+
+We only do so when we can prove it changes nothing:
+
+* The function is bound by a top-level ``set`` of a ``fun``, and nothing else
+  anywhere in the program sets or binds as a param that name. So every call site
+  after the ``set`` means that very function.
+* Its body sets no vars in its own scope (which would land in the caller's
+  instead), doesn't mention its own name, and is small.
+* Every other var its body reads is likewise never rebound, or else is
+  defined once at top level before the function, so it resolves the same from
+  any call site as from the function's closure.
+* The args are literals or var names. Those are free to evaluate any number of
+  times and in any order, and, since a function can set only its own vars, a
+  var name's value can't change while the body runs. If the body makes
+  closures, which would read a var later, only literals will do.
+
+Bodies substituted into call sites don't get inlined into again, so mutual
+recursion can't make us loop.
+
+"""
+from collections import Counter
+from os import environ
+
+from .syntax import SPECIAL_FORMS, is_literal, is_name, names_in
+
+
+# Set to False (or set $DABBLE_NO_INLINE) to see programs run as written, for
+# debugging:
+enabled = not environ.get('DABBLE_NO_INLINE')
+
+# The biggest body we'll inline, measured in atoms and lists:
+DEFAULT_THRESHOLD = 20
+
+
+class Stats:
+    """A tally of what the inliner found and did"""
+
+    def __init__(self):
+        #: Names of the functions judged inlinable
+        self.candidates = set()
+        #: How many call sites of each function got inlined
+        self.inlined = Counter()
+
+    def __str__(self):
+        lines = [f'{len(self.candidates)} inlinable functions, {sum(self.inlined.values())} call sites inlined']
+        lines += [f'  {name}: {count}' for name, count in self.inlined.most_common()]
+        return '\n'.join(lines)
+
+
+#: Running totals across every program inlined
+stats = Stats()
+
+
+def inline(expressions, threshold=DEFAULT_THRESHOLD, stats=stats):
+    """Return a copy of a parsed program with calls to small functions
+    inlined.
+
+    The original is left alone, so a cached parse tree stays good.
+
+    :arg expressions: A list of top-level expressions, as from ``parse()``
+
+    """
+    bindings = Counter()
+    for exp in expressions:
+        _count_bindings(exp, bindings)
+    # Names it's safe for an inlined body to refer to:
+    stable = {name for name in names_in(expressions) if not bindings[name]}
+    inlinable = {}
+
+    ret = []
+    for exp in expressions:
+        exp = _inline_calls(exp, inlinable, stats)
+        ret.append(exp)
+        if _is_top_level_set(exp) and bindings[exp[1]] == 1:
+            _, name, value = exp
+            if _is_inlinable(name, value, stable, threshold):
+                inlinable[name] = value
+                stats.candidates.add(name)
+            stable.add(name)
+    return ret
+
+
+def _is_top_level_set(exp):
+    return (isinstance(exp, list) and len(exp) == 3 and exp[0] == 'set' and
+            is_name(exp[1]))
+
+
+def _is_inlinable(name, value, stable, threshold):
+    if not _is_fun(value):
+        return False
+    _, params, body = value
+    return (all(is_name(p) for p in params) and
+            len(set(params)) == len(params) and
+            not _sets_in(body) and
+            _size(body) <= threshold and
+            _free_names(body, set(params)) <= stable - {name})
+
+
+def _inline_calls(exp, inlinable, stats):
+    """Return a copy of an expression with calls to inlinable functions
+    replaced by their bodies."""
+    if not isinstance(exp, list) or not exp:
+        return exp
+    if _is_fun(exp):
+        return ['fun', exp[1], _inline_calls(exp[2], inlinable, stats)]
+    if _is_special_form(exp):
+        return [exp[0], *(_inline_calls(e, inlinable, stats) for e in exp[1:])]
+
+    exp = [_inline_calls(e, inlinable, stats) for e in exp]
+    verb, *args = exp
+    function = inlinable.get(verb) if isinstance(verb, str) else None
+    if function is None:
+        return exp
+    _, params, body = function
+    substitutable = is_literal if _makes_closures(body) else _is_pure
+    if len(args) != len(params) or not all(substitutable(a) for a in args):
+        return exp
+    stats.inlined[verb] += 1
+    return _substitute(body, dict(zip(params, args)))
+
+
+def _substitute(exp, replacements):
+    """Return a copy of an expression with some var names replaced."""
+    if isinstance(exp, str):
+        return replacements.get(exp, exp)
+    if not isinstance(exp, list) or not exp:
+        return exp
+    if _is_fun(exp):
+        _, params, body = exp
+        shadowed = set(params) | _sets_in(body)
+        inner = {k: v for k, v in replacements.items() if k not in shadowed}
+        return ['fun', params, _substitute(body, inner)]
+    if _is_special_form(exp):
+        return [exp[0], *(_substitute(e, replacements) for e in exp[1:])]
+    return [_substitute(e, replacements) for e in exp]
+
+
+def _count_bindings(exp, bindings):
+    """Tally how many places bind each name, by ``set`` or as a param."""
+    if not isinstance(exp, list) or not exp:
+        return
+    if _is_fun(exp):
+        bindings.update(p for p in exp[1] if isinstance(p, str))
+        _count_bindings(exp[2], bindings)
+        return
+    if exp[0] == 'set' and len(exp) == 3:
+        bindings[exp[1]] += 1
+    for e in exp:
+        _count_bindings(e, bindings)
+
+
+def _sets_in(exp):
+    """Return the names an expression sets in its own scope, not counting
+    those set inside nested functions."""
+    if not isinstance(exp, list) or not exp or _is_fun(exp):
+        return set()
+    names = {exp[1]} if exp[0] == 'set' and len(exp) == 3 else set()
+    for e in exp[1:]:
+        names |= _sets_in(e)
+    return names
+
+
+def _free_names(exp, local):
+    """Return the var names an expression reads from outside, given the ones
+    bound in its own scope."""
+    if isinstance(exp, str):
+        return set() if exp in local or not is_name(exp) else {exp}
+    if not isinstance(exp, list) or not exp:
+        return set()
+    if _is_fun(exp):
+        _, params, body = exp
+        return _free_names(body, local | set(params) | _sets_in(body))
+    if _is_special_form(exp):
+        exp = exp[1:]
+    names = set()
+    for e in exp:
+        names |= _free_names(e, local)
+    return names
+
+
+def _makes_closures(exp):
+    return isinstance(exp, list) and (_is_fun(exp) or any(_makes_closures(e) for e in exp))
+
+
+def _size(exp):
+    return 1 + sum(_size(e) for e in exp) if isinstance(exp, list) else 1
+
+
+def _is_special_form(exp):
+    return isinstance(exp[0], str) and exp[0] in SPECIAL_FORMS
+
+
+def _is_fun(exp):
+    return (isinstance(exp, list) and len(exp) == 3 and exp[0] == 'fun' and
+            isinstance(exp[1], list))
+
+
+def _is_pure(exp):
+    """Return whether evaluating an expression can have no effects, so it's
+    fine to do so any number of times, including none."""
+    return is_literal(exp) or is_name(exp)
@@ -1,9 +1,13 @@
-from operator import lt, gt, le, ge, eq, add, mul, floordiv
+from operator import lt, gt, le, ge, eq, add, mul, floordiv, sub
 import re
 from sys import argv
 
+from . import inliner
 from .environment import Environment
 from .indent_parser import lex, parse
+from .inliner import inline
+from .parallel import pmap
+from .sequences import filter_, fold, map_, range_, take
 
 
 pervasives = Environment({
@@ -19,8 +23,31 @@ pervasives = Environment({
     '>=': ge,
     '<=': le,
     '==': eq,
+
+    'pmap': pmap,
+
+    'range': range_,
+    'map': map_,
+    'filter': filter_,
+    'take': take,
+    'fold': fold,
 })
 
+# Int-only stand-ins for the binary arithmetic and comparison pervasives. Call
+# sites of those get quickened into using these; see IntOp.
+int_ops = {
+    '+': add,
+    '*': mul,
+    '-': sub,
+    '/': floordiv,
+    '>': gt,
+    '<': lt,
+    '>=': ge,
+    '<=': le,
+    '==': eq,
+}
+Environment.watched = frozenset(int_ops)
+
 
 def eval(exp, env):
     """Evaluate an expression.
@@ -29,6 +56,19 @@ def eval(exp, env):
     :arg env Environment: The scope to look up or create vars in
 
     """
+    # Call sites quickened to int arithmetic or comparison. We skip looking up
+    # the op and building an args list, but only as long as the op hasn't been
+    # rebound anywhere we'd look it up from: in this env's tree or the
+    # pervasives. If an operand turns out not to be an int, we call the
+    # general pervasive, which the op must still be bound to.
+    if (type(exp) is list and type(exp[0]) is IntOp and
+            exp[0] not in env.tree_rebound and exp[0] not in Environment.rebound):
+        op1 = _eval_operand(exp[1], env)
+        op2 = _eval_operand(exp[2], env)
+        if type(op1) is int and type(op2) is int:
+            return exp[0].op(op1, op2)
+        return pervasives.vars[exp[0]](op1, op2)
+
     # Numeric literals:
     if is_number(exp):
         return exp
@@ -88,15 +128,23 @@ def eval(exp, env):
     if isinstance(exp, list):
         fn = eval(verb, env)
         args = [eval(e, env) for e in exp[1:]]
-        if callable(fn):  # Native functions 
-            return fn(*args)
-        elif isinstance(fn, Function):
+        if isinstance(fn, Function):
             # Make an empty env with nothing in it but bound param names.
             # (This is called the "activation environment".) It points to
             # the closed-over env as its parent.
             params_env = Environment(vars=dict(zip(fn.params, args)),
                                      parent=fn.env)
             return eval(fn.body, params_env)
+        elif callable(fn):  # Native functions
+            # Quicken calls to int ops on ints, so they take the fast path at
+            # the top next time:
+            if (len(args) == 2 and type(verb) is str and verb in int_ops and
+                    type(args[0]) is int and type(args[1]) is int and
+                    fn is pervasives.vars[verb] and
+                    verb not in env.tree_rebound and
+                    verb not in Environment.rebound):
+                exp[0] = IntOp(verb)
+            return fn(*args)
 
     raise Exception(f'Unimplemented: {exp}')
 
@@ -104,12 +152,38 @@ def eval(exp, env):
 def run(program, env=None):
     """Evaluate a string containing a sequence of s-exprs as a Dabble
     program."""
+    return run_parsed(optimized(parse(lex(program))), env)
+
+
+def optimized(parsed):
+    """Return a parsed program run through whatever optimization passes are
+    enabled."""
+    return inline(parsed) if inliner.enabled else parsed
+
+
+def run_parsed(parsed, env=None):
+    """Evaluate an already-parsed program, a list of top-level s-exprs.
+
+    A parse tree can be cached and run any number of times, even concurrently,
+    as long as each run gets its own env. The only change running makes to it
+    is quickening call sites, which keeps their meaning in any env.
+
+    """
     if env is None:
         env = Environment(parent=pervasives)
-    parsed = parse(lex(program))
     return _eval_block(['dummy', *parsed], env)
 
 
+def _eval_operand(exp, env):
+    """Evaluate an arg of a quickened call, short-cutting the commonest
+    cases: int literals and var names."""
+    if type(exp) is int:
+        return exp
+    if type(exp) is str and exp[0] != '"':
+        return env.look_up(exp)
+    return eval(exp, env)
+
+
 def _eval_block(block, env):
     """Evaluate each expression of a `begin` block in an environment. Value is
     the value of the last expression."""
@@ -154,5 +228,27 @@ class Function:
                                  parent=self.env)
         return eval(self.body, params_env)
 
+    # So pervasives and host code can call a Function like any other callable:
+    __call__ = call
+
     def __str__(self):
         return f'<Function ({self.params})>'
+
+
+class IntOp(str):
+    """The verb of a call site that has been quickened into int arithmetic or
+    comparison
+
+    It's still equal to the name of the op, so the tree means the same to
+    everything that doesn't know about quickening, and eval() can fall back to
+    looking the name up like any other.
+
+    """
+
+    def __new__(cls, name):
+        self = super().__new__(cls, name)
+        self.op = int_ops[name]
+        return self
+
+    def __reduce__(self):
+        return IntOp, (str(self),)
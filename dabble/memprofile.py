@@ -0,0 +1,263 @@
+"""A memory profiler that says which parts of a Dabble program allocate
+
+tracemalloc knows only which lines of the *interpreter* allocate, so we pair it
+with bookkeeping of our own: while profiling, every evaluation of a list goes
+through ``MemoryProfiler.eval()``, which notes how traced memory and its peak
+moved and charges the change (minus what nested evaluations account for) to the
+Dabble source line, the special form, and the user function it happened in. It
+also counts the allocations the interpreter makes on the program's behalf:
+activation envs, args lists, closures, and ints too big for a machine word.
+Like bytes, these are charged to where they're made: an activation env to the
+call that makes it, not the function it's made for.
+
+Finally, it keeps weak references to the envs and Functions it sees made, so it
+can tell which are still alive at the end, a likely source of growth in
+long-running embedded uses.
+
+"""
+from collections import Counter, defaultdict
+from gc import collect
+from sys import getsizeof
+import tracemalloc
+import weakref
+
+from . import interpreter
+from .environment import Environment
+from .indent_parser import lex, parse
+from .interpreter import Function, IntOp, pervasives, run_parsed
+from .syntax import SPECIAL_FORMS
+
+
+TOP_LEVEL = '<top level>'
+
+
+def profile(program, env=None, top=10):
+    """Run a program under the memory profiler.
+
+    The program runs as written, without inlining, so everything can be
+    charged to the line it's on.
+
+    :return: The program's value and a ``Report``
+
+    """
+    current_line = [0]
+    list_lines = {}
+    parsed = parse(lex(program, current_line), current_line, list_lines)
+    # Hang onto the env till we've reported, so we see what it keeps alive:
+    if env is None:
+        env = Environment(parent=pervasives)
+    with MemoryProfiler(list_lines) as profiler:
+        result = run_parsed(parsed, env)
+    return result, profiler.report(top=top)
+
+
+class Tally:
+    """What got allocated on behalf of some part of a program"""
+
+    __slots__ = ('evals', 'bytes', 'peak', 'envs', 'arg_lists', 'closures',
+                 'big_ints', 'big_int_bytes')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def add(self, other):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+class _Frame:
+    """An evaluation in progress"""
+
+    __slots__ = ('exp', 'line', 'function', 'child_bytes', 'child_peak',
+                 'callee', 'envs')
+
+    def __init__(self, exp, line, function):
+        self.exp = exp
+        self.line = line
+        self.function = function
+        self.child_bytes = 0
+        self.child_peak = 0
+        #: What the verb evaluated to, if this is a call and it has been
+        self.callee = None
+        #: Activation envs made while evaluating this but not its children
+        self.envs = 0
+
+
+def _note_callee(frame, exp, result):
+    """If ``exp`` is the verb of the call ``frame`` is evaluating, remember
+    what it came to."""
+    if frame.exp and exp is frame.exp[0] and frame.callee is None:
+        frame.callee = result
+
+
+class MemoryProfiler:
+    """A context manager within which every run of a Dabble program gets its
+    memory use tallied
+
+    Profiling swaps out the interpreter's eval() for the whole process, so don't
+    profile in one thread while running programs you don't want profiled in
+    another.
+
+    """
+
+    def __init__(self, list_lines=None):
+        """
+        :arg list_lines: Source line numbers of parse-tree lists, keyed by id(),
+            as from ``parse()``. Without them, everything is charged to line
+            None.
+        """
+        self.list_lines = list_lines or {}
+        # (line, form, function) -> Tally:
+        self.tallies = defaultdict(Tally)
+        self._stack = [_Frame(None, None, TOP_LEVEL)]
+        # Labels of functions, keyed by id() of their bodies:
+        self._bodies = {}
+        # Names fun forms are about to be bound to, keyed by id() of the form:
+        self._names = {}
+        # Envs and Functions made while profiling, mapped to (kind, label):
+        self._made = weakref.WeakKeyDictionary()
+        self._eval = interpreter.eval
+        self._call = Function.call
+        self._was_tracing = tracemalloc.is_tracing()
+
+    def __enter__(self):
+        if not self._was_tracing:
+            tracemalloc.start()
+        interpreter.eval = self.eval
+
+        # eval() makes an env for each Function it calls itself, which we see
+        # it do. Natives like map call Functions by way of call(), which makes
+        # one too:
+        stack = self._stack
+        original_call = self._call
+
+        def call(function, *args):
+            stack[-1].envs += 1
+            return original_call(function, *args)
+        Function.call = Function.__call__ = call
+        return self
+
+    def __exit__(self, *exc_info):
+        interpreter.eval = self._eval
+        Function.call = Function.__call__ = self._call
+        self._final_memory = tracemalloc.get_traced_memory()
+        self._final_snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, filename)
+            for filename in (__file__, tracemalloc.__file__, weakref.__file__)])
+        if not self._was_tracing:
+            tracemalloc.stop()
+
+    def eval(self, exp, env):
+        """Evaluate an expression as interpreter.eval() does, charging what it
+        allocates to its line, form, and function."""
+        parent = self._stack[-1]
+        if type(exp) is not list:
+            result = self._eval(exp, env)  # Atoms allocate nothing of note.
+            _note_callee(parent, exp, result)
+            return result
+
+        line = self.list_lines.get(id(exp), parent.line)
+        verb = exp[0] if exp else None
+        form = verb if type(verb) is str and verb in SPECIAL_FORMS else 'call'
+        function = self._bodies.get(id(exp))
+        entering_function = function is not None
+        if not entering_function:
+            function = parent.function
+        if form == 'set' and len(exp) == 3 and isinstance(exp[2], list):
+            self._names[id(exp[2])] = exp[1]
+        frame = _Frame(exp, line, function)
+
+        self._stack.append(frame)
+        before, before_peak = tracemalloc.get_traced_memory()
+        try:
+            result = self._eval(exp, env)
+        finally:
+            self._stack.pop()
+        after, after_peak = tracemalloc.get_traced_memory()
+
+        grown = after - before
+        peak_rise = max(0, after_peak - before_peak)
+        tally = self.tallies[(line, form, function)]
+        tally.evals += 1
+        tally.bytes += grown - frame.child_bytes
+        tally.peak += peak_rise - frame.child_peak
+        parent.child_bytes += grown
+        parent.child_peak += peak_rise
+        _note_callee(parent, exp, result)
+
+        if entering_function:
+            # Evaluating a body in an activation env. Keep an eye on it, in
+            # case closures keep it alive.
+            self._made[env] = ('Environment', function)
+        tally.envs += frame.envs
+        if form == 'call' and type(verb) is not IntOp:  # Quickened calls make no args list.
+            tally.arg_lists += 1
+            if isinstance(frame.callee, Function):
+                tally.envs += 1
+            if type(result) is int and result.bit_length() > 63:
+                tally.big_ints += 1
+                tally.big_int_bytes += getsizeof(result)
+        elif form == 'fun' and isinstance(result, Function):
+            tally.closures += 1
+            label = self._names.get(id(exp)) or f'<fun at line {line}>'
+            if isinstance(result.body, list):
+                self._bodies[id(result.body)] = label
+            self._made[result] = ('Function', label)
+        return result
+
+    def report(self, top=10):
+        """Return a ``Report`` of what we saw. Call this after leaving the
+        ``with`` block."""
+        collect()
+        retained = Counter(self._made.values())
+        return Report(self.tallies, retained, *self._final_memory,
+                      self._final_snapshot.statistics('lineno')[:top], top)
+
+
+class Report:
+    """The findings of a ``MemoryProfiler``, which it prints nicely as"""
+
+    def __init__(self, tallies, retained, final_bytes, peak_bytes, host_sites, top=10):
+        """
+        :arg tallies: A map of (line, form, function) to ``Tally``
+        :arg retained: A Counter of (kind, label) of envs and Functions still
+            alive at the end
+        :arg host_sites: tracemalloc statistics on the interpreter lines
+            holding the most memory at the end
+        """
+        self.tallies = tallies
+        self.retained = retained
+        self.final_bytes = final_bytes
+        self.peak_bytes = peak_bytes
+        self.host_sites = host_sites
+        self.top = top
+
+    def by(self, dimension):
+        """Return a list of (key, Tally) summed over one of 'line', 'form', or
+        'function', the biggest allocators first."""
+        index = ('line', 'form', 'function').index(dimension)
+        totals = defaultdict(Tally)
+        for key, tally in self.tallies.items():
+            totals[key[index]].add(tally)
+        return sorted(totals.items(),
+                      key=lambda item: (item[1].bytes, item[1].peak),
+                      reverse=True)
+
+    def __str__(self):
+        out = [f'Traced memory at end: {self.final_bytes} bytes; peak: {self.peak_bytes} bytes']
+        columns = '{:>18} {:>8} {:>11} {:>11} {:>6} {:>9} {:>8} {:>8}'
+        for dimension in ('line', 'form', 'function'):
+            out += ['', f'By {dimension}:',
+                    columns.format(dimension, 'evals', 'net bytes', 'peak rise',
+                                   'envs', 'arg lists', 'closures', 'big ints')]
+            for key, tally in self.by(dimension)[:self.top]:
+                out.append(columns.format(str(key)[:18], tally.evals, tally.bytes,
+                                          tally.peak, tally.envs, tally.arg_lists,
+                                          tally.closures, tally.big_ints))
+        out += ['', 'Still alive at end:']
+        for (kind, label), count in self.retained.most_common(self.top):
+            out.append(f'{count:>8} {kind} from {label}')
+        out += ['', 'Interpreter lines holding the most memory at end:']
+        out += [f'    {stat}' for stat in self.host_sites]
+        return '\n'.join(out)
@@ -0,0 +1,155 @@
+"""Farming calls to pure Dabble functions out to worker processes
+
+A ``Function`` can't be pickled as it stands: its env chain reaches all the way
+up to the pervasives, which hold lambdas. So we ship a portable copy instead:
+its params and body plus just the bindings its body could read, with any
+``Function``s among those made portable in turn. The worker brings it back to
+life on top of its own pervasives.
+
+"""
+from os import cpu_count
+import pickle
+from threading import Lock
+
+from .environment import Environment
+from .syntax import names_in
+
+
+# What pickling raises when it meets something it can't handle:
+PICKLING_ERRORS = (pickle.PicklingError, TypeError, AttributeError)
+
+_pool = None
+_pool_lock = Lock()
+
+# Whether we're running inside a pool worker, where pmap should just run
+# serially rather than spawn pools of its own:
+_in_worker = False
+
+
+def pmap(function, inputs, chunk_size=None):
+    """Call a function on each of some inputs in parallel, and return a list of
+    the results in order.
+
+    The function had better be pure: whatever it does to its captured
+    variables stays in the worker process. If what it captures, its inputs, or
+    its results can't be pickled, we quietly run serially instead.
+
+    :arg function: A ``Function`` or a picklable Python callable
+    :arg inputs: An iterable of arguments, one per call
+    :arg chunk_size: How many calls to send to a worker at a time. By default,
+        enough to give each worker about 4 chunks.
+
+    """
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError(f'pmap chunk size must be at least 1, not {chunk_size}.')
+    inputs = list(inputs)
+    if _in_worker or len(inputs) < 2:
+        return _map_serially(function, inputs)
+    try:
+        payload = pickle.dumps(_portable(function))
+    except PICKLING_ERRORS:
+        return _map_serially(function, inputs)
+
+    if chunk_size is None:
+        chunk_size = max(1, len(inputs) // (_worker_count() * 4))
+    pool = _get_pool()
+    futures = [pool.submit(_call_chunk, payload, inputs[i:i + chunk_size])
+               for i in range(0, len(inputs), chunk_size)]
+    try:
+        return [result for future in futures for result in future.result()]
+    except PICKLING_ERRORS:
+        # An input or result couldn't make the trip, like a closure the
+        # function returned. (Or the function itself raised one of these, in
+        # which case it'll raise it again here.)
+        for future in futures:
+            future.cancel()
+        return _map_serially(function, inputs)
+
+
+def _map_serially(function, inputs):
+    return [function(i) for i in inputs]
+
+
+def _worker_count():
+    return cpu_count() or 1
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:  # The daemon may have several threads in pmap at once.
+        if _pool is None:
+            # Import this only now. It drags in multiprocessing, which would
+            # otherwise slow the startup of every run, pmap or no.
+            from concurrent.futures import ProcessPoolExecutor
+
+            _pool = ProcessPoolExecutor(_worker_count(), initializer=_become_worker)
+    return _pool
+
+
+def _become_worker():
+    global _in_worker
+    _in_worker = True
+
+
+def _call_chunk(payload, chunk):
+    """Run in a worker: revive the function, and call it on each input."""
+    function = _revive(pickle.loads(payload))
+    return _map_serially(function, chunk)
+
+
+class _FunctionRef:
+    """A stand-in, inside a portable function's bindings, for another
+    portable function, so cycles like recursion survive pickling"""
+
+    def __init__(self, index):
+        self.index = index
+
+
+def _portable(function):
+    """Return a picklable description of a function: either the callable
+    itself or, for a ``Function``, a list of (params, body, bindings) records
+    for it and every ``Function`` it can reach, itself first."""
+    if not isinstance(function, interpreter.Function):
+        return function
+    records = []
+    indices = {}
+
+    def add(function):
+        if id(function) in indices:
+            return _FunctionRef(indices[id(function)])
+        indices[id(function)] = len(records)
+        bindings = {}
+        records.append((function.params, function.body, bindings))
+        for name in names_in(function.body) - set(function.params):
+            try:
+                value = function.env.look_up(name)
+            except Exception:
+                continue  # Unbound
+            if value is interpreter.pervasives.vars.get(name):
+                continue  # The worker has its own.
+            if isinstance(value, interpreter.Function):
+                value = add(value)
+            bindings[name] = value
+        return _FunctionRef(indices[id(function)])
+
+    add(function)
+    return records
+
+
+def _revive(portable):
+    """Turn the output of ``_portable()`` back into something callable."""
+    if not isinstance(portable, list):
+        return portable
+    functions = [interpreter.Function(params, body, Environment(parent=interpreter.pervasives))
+                 for params, body, _ in portable]
+    for function, (_, _, bindings) in zip(functions, portable):
+        for name, value in bindings.items():
+            if isinstance(value, _FunctionRef):
+                value = functions[value.index]
+            function.env.assign(name, value)
+    return functions[0]
+
+
+# The interpreter imports pmap from us to fill out its pervasives, so import it
+# last and by module, which works whichever of us gets imported first:
+from . import interpreter  # noqa: E402
@@ -0,0 +1,44 @@
+"""Lazy sequences: pervasives for making, transforming, and consuming them
+
+A sequence is any Python iterable, so host code can pass in a list, a file, or
+a generator of its own, and it's used as-is rather than copied. Everything but
+``fold`` is lazy, so a chain like ``fold + 0 (take 10 (map square (range n)))``
+runs in constant memory, however big n is.
+
+Like Python generators, what ``map``, ``filter``, and ``take`` return can be
+walked through only once.
+
+"""
+from functools import reduce
+from itertools import islice
+
+
+def range_(start, stop=None, step=1):
+    """Return the ints from start up to but not including stop. With one arg,
+    start from 0 and stop there instead."""
+    if stop is None:
+        start, stop = 0, start
+    return range(start, stop, step)
+
+
+def map_(function, sequence):
+    """Lazily return the results of calling a function on each item of a
+    sequence."""
+    return (function(item) for item in sequence)
+
+
+def filter_(function, sequence):
+    """Lazily return the items of a sequence for which a function returns
+    something truthy, just as ``if`` would judge it."""
+    return (item for item in sequence if function(item))
+
+
+def take(count, sequence):
+    """Lazily return at most the first `count` items of a sequence."""
+    return islice(sequence, count)
+
+
+def fold(function, initial, sequence):
+    """Combine the items of a sequence, left to right, by calling a function on
+    the result so far (starting with `initial`) and the next item."""
+    return reduce(function, sequence, initial)
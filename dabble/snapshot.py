@@ -0,0 +1,102 @@
+"""Saving a top-level env, functions and all, to a file and restoring it later
+
+That lets a program that spends a long time setting up lookup tables and
+function definitions do so once, after which each run picks up where it left
+off.
+
+It's pickle underneath, which keeps shared structure and cycles (like a
+recursive function's env pointing back at the function) intact. The pervasives
+aren't saved, just referred to by name, so a snapshot restores onto whatever
+pervasives the restoring process has.
+
+"""
+from io import BytesIO
+from os import replace, unlink
+from os.path import abspath, dirname
+import pickle
+from tempfile import mkstemp
+
+from .exceptions import SnapshotError
+from .interpreter import pervasives
+from .parallel import PICKLING_ERRORS
+
+
+MAGIC = b'DABBLE SNAPSHOT 1\n'
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        # Values bound elsewhere to a pervasive, like after `set minus -`. Some
+        # pervasives are lambdas, which pickle can't handle itself. Plain values
+        # like `true` pickle fine as they are.
+        self._pervasive_names = {id(value): name
+                                 for name, value in pervasives.vars.items()
+                                 if callable(value)}
+
+    def persistent_id(self, obj):
+        if obj is pervasives:
+            return ('env',)
+        name = self._pervasive_names.get(id(obj))
+        return None if name is None else ('var', name)
+
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        if pid == ('env',):
+            return pervasives
+        kind, name = pid
+        try:
+            return pervasives.vars[name]
+        except KeyError:
+            raise SnapshotError(f'The snapshot refers to a pervasive "{name}", which no longer exists.')
+
+
+def save(env, path):
+    """Write an env and everything reachable from it to a file.
+
+    We write a temp file and rename it into place, so a save that fails
+    leaves any snapshot already at `path` alone.
+
+    :raise SnapshotError: if something in the env can't be saved, like a
+        lazy sequence or a host lambda
+
+    """
+    fd, temp_path = mkstemp(suffix='.tmp', dir=dirname(abspath(path)))
+    try:
+        with open(fd, 'wb') as file:
+            file.write(MAGIC)
+            _Pickler(file).dump(env)
+    except BaseException as exc:
+        unlink(temp_path)
+        if isinstance(exc, PICKLING_ERRORS):
+            raise SnapshotError(f'Can\'t save {_unsavable_var(env)}: {exc}') from exc
+        raise
+    replace(temp_path, path)
+
+
+def _unsavable_var(env):
+    """Return a description of the first var in an env that can't be
+    saved."""
+    for name, value in env.vars.items():
+        try:
+            _Pickler(BytesIO()).dump(value)
+        except PICKLING_ERRORS:
+            return f'"{name}"'
+    return 'the env'
+
+
+def restore(path):
+    """Return the env saved in a snapshot file.
+
+    Only restore snapshots you trust. Like any pickle, they can run arbitrary
+    code.
+
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError(f'{path} is not a Dabble snapshot.')
+        try:
+            return _Unpickler(file).load()
+        except (pickle.UnpicklingError, EOFError) as exc:
+            raise SnapshotError(f'{path} is truncated or corrupt: {exc}') from exc
@@ -0,0 +1,25 @@
+"""Facts about the shapes of parsed Dabble programs, for the passes that walk
+them"""
+
+SPECIAL_FORMS = {'begin', 'set', 'if', 'while', 'fun'}
+
+
+def names_in(exp):
+    """Return every var name mentioned anywhere in an expression."""
+    if isinstance(exp, list):
+        names = set()
+        for e in exp:
+            names |= names_in(e)
+        return names
+    return {exp} if is_name(exp) else set()
+
+
+def is_name(exp):
+    """Return whether an expression is a var name, as opposed to a literal or
+    the verb of a special form."""
+    return isinstance(exp, str) and not is_literal(exp) and exp not in SPECIAL_FORMS
+
+
+def is_literal(exp):
+    """Return whether an expression is a number or string literal."""
+    return isinstance(exp, int) or (isinstance(exp, str) and exp.startswith('"'))
@@ -0,0 +1,21 @@
+from pytest import fixture
+
+from .testing import eval_both_ways, eval_with_new_env_both_ways, run_both_ways
+
+
+@fixture(params=['interpreted', 'transpiled'])
+def backend(request, monkeypatch):
+    """Run a test module's tests once as written and once more with its
+    ``run``, ``eval``, and ``eval_with_new_env`` also running what they're
+    given through the transpiler and checking it matches the interpreter.
+
+    Opt a module in with ``pytestmark = mark.usefixtures('backend')``.
+
+    """
+    if request.param == 'transpiled':
+        for name, both_ways in [('run', run_both_ways),
+                                ('eval', eval_both_ways),
+                                ('eval_with_new_env', eval_with_new_env_both_ways)]:
+            if hasattr(request.module, name):
+                monkeypatch.setattr(request.module, name, both_ways)
+    return request.param
@@ -0,0 +1,58 @@
+"""Tests for the generated corpora and the front-end benchmark"""
+
+from pytest import mark
+
+from dabble.corpus import corpus
+from dabble.frontend_bench import format_results, measure, parse_size, pieces
+from dabble.indent_parser import lex, parse
+
+
+def test_deterministic():
+    assert corpus(5000, seed=7) == corpus(5000, seed=7)
+    assert corpus(5000, seed=7) != corpus(5000, seed=8)
+
+
+def test_size():
+    assert 20000 <= len(corpus(20000)) < 25000
+
+
+@mark.parametrize('seed', range(20))
+def test_always_valid(seed):
+    """Every corpus should lex and parse, however hard we lean on the tricky
+    indentation rules."""
+    parse(lex(corpus(3000, seed=seed, max_depth=12, comment_share=0.4,
+                     tab_share=0.5, paren_share=0.3, partial_share=0.8)))
+
+
+def test_knobs_take_effect():
+    plain = corpus(20000, comment_share=0, tab_share=0, paren_share=0)
+    assert '\t' not in plain and '#' not in plain and '(' not in plain
+    fancy = corpus(20000, comment_share=0.3, tab_share=0.5, paren_share=0.3)
+    assert '\t' in fancy and '#' in fancy and '(' in fancy
+    assert max(len(line) for line in corpus(20000, line_width=200).splitlines()) > 200
+
+
+def test_measure(tmp_path):
+    path = tmp_path / 'corpus.dab'
+    path.write_text(corpus(5000))
+    results = measure(path, repeat=1)
+    assert results['tokens'] == len(list(lex(corpus(5000))))
+    assert results['bytes'] == len(corpus(5000))
+    assert results['parse_peak'] > 0
+    assert 'lex tokens/s' in format_results([results])
+
+
+def test_pieces_parse_on_their_own(tmp_path):
+    text = corpus(50000, paren_share=0.3, partial_share=0.5)
+    path = tmp_path / 'corpus.dab'
+    path.write_text(text)
+    parts = list(pieces(path, 5000))
+    assert len(parts) > 2
+    assert ''.join(parts) == text
+    assert [e for part in parts for e in parse(lex(part))] == parse(lex(text))
+
+
+def test_parse_size():
+    assert parse_size('10K') == 10240
+    assert parse_size('1.5mb') == 1572864
+    assert parse_size('100') == 100
@@ -0,0 +1,120 @@
+"""Tests for the `dabble serve` daemon and its client"""
+
+from concurrent.futures import ThreadPoolExecutor
+from os import getuid
+import socket
+from threading import Thread
+
+from pytest import fixture, raises
+
+from dabble import client, command
+from dabble.client import DaemonUnavailable, default_socket_path, request
+from dabble.command import main
+from dabble.daemon import Server, parsed
+from dabble.interpreter import IntOp
+
+
+@fixture
+def socket_path(tmp_path):
+    """Run a daemon for the duration of a test, and return its socket path."""
+    path = str(tmp_path / 'dabble.sock')
+    server = Server(path, workers=4)
+    thread = Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield path
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+
+
+def test_source_and_path_requests(socket_path, tmp_path):
+    assert request(socket_path, source='+ 1 2') == {'result': '3'}
+    program = tmp_path / 'square.dab'
+    program.write_text('set square\n    fun (x)\n        * x x\nsquare 7\n')
+    assert request(socket_path, path=str(program)) == {'result': '49'}
+
+
+def test_errors_are_reported(socket_path):
+    response = request(socket_path, source='+ undefined-var 1')
+    assert 'undefined-var' in response['error']
+
+
+def test_requests_get_isolated_envs(socket_path):
+    request(socket_path, source='set leaked 5')
+    assert 'leaked' in request(socket_path, source='leaked')['error']
+
+
+def test_rebinding_in_one_request_keeps_quickening_in_others(socket_path):
+    request(socket_path, source='set f (fun (+) (+ 1 2))\nf (fun (a b) a)')
+    source = 'set n 0\nwhile (< n 3) (set n (+ n 1))\nn'
+    assert request(socket_path, source=source) == {'result': '3'}
+    assert type(parsed(source)[1][2][2][0]) is IntOp
+
+
+def test_concurrent_clients(socket_path):
+    programs = [f'* {n} {n}' for n in range(40)]
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(lambda p: request(socket_path, source=p),
+                                  programs))
+    assert responses == [{'result': str(n * n)} for n in range(40)]
+
+
+def test_no_daemon(tmp_path):
+    with raises(DaemonUnavailable):
+        request(str(tmp_path / 'nobody-home.sock'), source='1')
+
+
+def test_someone_elses_socket_is_not_trusted(socket_path, monkeypatch):
+    monkeypatch.setattr(client, 'getuid', lambda: 1 + getuid())
+    with raises(DaemonUnavailable):
+        request(socket_path, source='1')
+
+
+def test_hanging_up_without_answering_falls_back(tmp_path, capsys):
+    """As when the daemon dies mid-request"""
+    path = str(tmp_path / 'dying.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(path)
+        listener.listen()
+
+        def hang_up():
+            connection, _ = listener.accept()
+            connection.recv(1024)
+            connection.close()
+        thread = Thread(target=hang_up)
+        thread.start()
+        program = tmp_path / 'add.dab'
+        program.write_text('+ 40 2\n')
+        main([str(program), '--socket', path])
+        thread.join()
+    assert capsys.readouterr().out == '42\n'
+
+
+def test_default_socket_prefers_runtime_dir(monkeypatch):
+    monkeypatch.delenv('DABBLE_SOCKET', raising=False)
+    monkeypatch.setenv('XDG_RUNTIME_DIR', '/run/user/1000')
+    assert default_socket_path() == '/run/user/1000/dabble.sock'
+
+
+def test_main_uses_daemon_when_up_and_falls_back_when_not(socket_path, tmp_path,
+                                                          capsys, monkeypatch):
+    answered = []
+
+    def spying_request(*args, **kwargs):
+        try:
+            response = request(*args, **kwargs)
+        except DaemonUnavailable:
+            answered.append(False)
+            raise
+        answered.append(True)
+        return response
+    monkeypatch.setattr(command, 'request', spying_request)
+
+    program = tmp_path / 'add.dab'
+    program.write_text('+ 40 2\n')
+    main([str(program), '--socket', socket_path])
+    main([str(program), '--socket', str(tmp_path / 'nobody-home.sock')])
+    assert answered == [True, False]
+    assert capsys.readouterr().out == '42\n42\n'
@@ -0,0 +1,162 @@
+"""Tests for the small-function inliner"""
+
+from dabble.indent_parser import lex, parse
+from dabble.inliner import inline, Stats
+from dabble.interpreter import run_parsed
+
+
+def inlined(text):
+    """Parse and inline a program, and return the new tree and the stats."""
+    stats = Stats()
+    return inline(parse(lex(text)), stats=stats), stats
+
+
+def assert_same_result(text):
+    """Make sure inlining doesn't change what a program does."""
+    tree = parse(lex(text))
+    assert run_parsed(inline(tree, stats=Stats())) == run_parsed(tree)
+
+
+def test_simple_call_is_inlined():
+    tree, stats = inlined("""
+set square
+    fun (x)
+        * x x
+square 7
+    """)
+    assert tree[1] == ['*', 7, 7]
+    assert stats.inlined == {'square': 1}
+    assert stats.candidates == {'square'}
+
+
+def test_original_tree_is_left_alone():
+    original = parse(lex('set id (fun (x) x)\nid 3'))
+    inline(original, stats=Stats())
+    assert original[1] == ['id', 3]
+
+
+def test_calls_inside_other_functions():
+    tree, _ = inlined("""
+set square
+    fun (x)
+        * x x
+set sum-squares
+    fun (a b)
+        + (square a) (square b)
+sum-squares 3 4
+    """)
+    assert tree[1] == ['set', 'sum-squares',
+                       ['fun', ['a', 'b'], ['+', ['*', 'a', 'a'], ['*', 'b', 'b']]]]
+    # sum-squares calls only stable functions, so it's inlined in turn:
+    assert tree[2] == ['+', ['*', 3, 3], ['*', 4, 4]]
+
+
+def test_recursive_functions_are_not_inlined():
+    tree, stats = inlined("""
+set factorial
+    fun (x)
+        if (== x 1)
+            1
+            * x (factorial (- x 1))
+factorial 5
+    """)
+    assert tree[1] == ['factorial', 5]
+    assert not stats.candidates
+
+
+def test_reassigned_functions_are_not_inlined():
+    tree, _ = inlined("""
+set f (fun (x) x)
+set g
+    fun ()
+        set f 3
+f 1
+    """)
+    assert tree[2] == ['f', 1]
+
+
+def test_params_named_like_the_function_block_inlining():
+    _, stats = inlined("""
+set f (fun (x) x)
+set g (fun (f) (f 1))
+    """)
+    assert stats.candidates == {'g'}
+
+
+def test_bodies_that_set_vars_are_not_inlined():
+    """They'd set them in the caller's scope."""
+    _, stats = inlined("""
+set f
+    fun (x)
+        begin
+            set y x
+            y
+f 1
+    """)
+    assert not stats.candidates
+
+
+def test_only_pure_args_are_substituted():
+    tree, _ = inlined("""
+set square (fun (x) (* x x))
+set n 3
+square (+ n 1)
+    """)
+    assert tree[2] == ['square', ['+', 'n', 1]]
+
+
+def test_closures_take_only_literals():
+    """A closure made by the body would read a var arg later, by which time
+    the caller may have changed it."""
+    tree, _ = inlined("""
+set make-adder
+    fun (how-much)
+        fun (addend)
+            + addend how-much
+set a (make-adder 100)
+set n 5
+set b (make-adder n)
+    """)
+    assert tree[1] == ['set', 'a', ['fun', ['addend'], ['+', 'addend', 100]]]
+    assert tree[3] == ['set', 'b', ['make-adder', 'n']]
+
+
+def test_nested_params_are_not_captured():
+    tree, _ = inlined("""
+set f
+    fun (x)
+        fun (x)
+            x
+f 1
+    """)
+    assert tree[1] == ['fun', ['x'], 'x']
+
+
+def test_functions_reading_unstable_vars_are_not_inlined():
+    _, stats = inlined("""
+set f (fun () limit)
+set g
+    fun (limit)
+        (f)
+g 3
+    """)
+    assert 'f' not in stats.candidates
+
+
+def test_results_are_unchanged():
+    assert_same_result("""
+set square
+    fun (x)
+        * x x
+set make-adder
+    fun (how-much)
+        fun (addend)
+            + addend (square how-much)
+set counter 0
+set total 0
+while (< counter 10)
+    begin
+        set total (+ total ((make-adder 2) (square counter)))
+        set counter (+ counter 1)
+total
+    """)
@@ -1,4 +1,4 @@
-from pytest import skip
+from pytest import mark, skip
 
 from dabble.environment import Environment
 from dabble.interpreter import eval, pervasives, run
@@ -6,6 +6,10 @@ from dabble.interpreter import eval, pervasives, run
 from .testing import eval_with_new_env
 
 
+# Check the transpiler against everything here too:
+pytestmark = mark.usefixtures('backend')
+
+
 def test_numbers_evaluate_to_themselves():
     assert run('1') == 1
 
@@ -0,0 +1,101 @@
+"""Tests for the memory profiler"""
+
+from dabble import interpreter
+from dabble.command import main
+from dabble.indent_parser import lex, parse
+from dabble.interpreter import Function, run
+from dabble.memprofile import MemoryProfiler, profile
+
+
+PROGRAM = """
+set make-adder
+    fun (how-much)
+        fun (addend)
+            + addend how-much
+
+set adders (make-adder 1)
+set more-adders (make-adder 2)
+set factorial
+    fun (x)
+        if (== x 1)
+            1
+            * x (factorial (- x 1))
+factorial 30
+"""
+
+
+def test_lists_know_their_lines():
+    current_line = [0]
+    list_lines = {}
+    tree = parse(lex('# comment\na\n  (b\nc)\nd e', current_line), current_line, list_lines)
+    assert list_lines[id(tree[0])] == 2
+    assert list_lines[id(tree[0][1])] == 3
+    assert list_lines[id(tree[1])] == 5
+
+
+def test_attribution():
+    result, report = profile(PROGRAM)
+    assert result == run('set f (fun (x) (if (== x 1) 1 (* x (f (- x 1)))))\nf 30')
+
+    by_function = dict(report.by('function'))
+    assert by_function['factorial'].envs == 29  # The recursive calls
+    assert by_function['factorial'].big_ints > 0
+    assert by_function['make-adder'].closures == 2
+    assert by_function['make-adder'].envs == 0
+    assert by_function['<top level>'].envs == 3
+
+    by_form = dict(report.by('form'))
+    assert by_form['fun'].closures == 4  # 2 top-level, 2 inner
+    # Quickened calls, like `== x 1` after the first few, make none:
+    assert 0 < by_form['call'].arg_lists < by_form['call'].evals
+
+    by_line = dict(report.by('line'))
+    assert by_line[13].arg_lists > 0  # The recursive `*` line
+
+    # The two adders and the envs they close over outlive the run:
+    assert report.retained[('Function', '<fun at line 4>')] == 2
+    assert report.retained[('Environment', 'make-adder')] == 2
+    assert 'By function:' in str(report)
+
+
+def test_envs_for_calls_to_functions_of_any_body():
+    """Count an env for each call to a Function, whether its body is a list or
+    not and whether eval() or a native calls it."""
+    _, report = profile('set id (fun (x) x)\n'
+                        'set i 0\n'
+                        'while (< i 50)\n'
+                        '    begin\n'
+                        '        id i\n'
+                        '        set i (+ i 1)\n'
+                        'fold + 0 (map id (range 1 4))')
+    by_line = dict(report.by('line'))
+    assert by_line[5].envs == 50
+    assert by_line[7].envs == 3
+
+
+def test_quickened_calls_make_no_arg_lists():
+    _, report = profile('set i 0\n'
+                        'while (< i 50)\n'
+                        '    set i (+ i 1)')
+    by_line = dict(report.by('line'))
+    assert by_line[2].evals > 50
+    assert by_line[2].arg_lists < 5
+
+
+def test_eval_is_restored():
+    original = interpreter.eval
+    original_call = Function.__call__
+    with MemoryProfiler():
+        assert interpreter.eval is not original
+        run('+ 1 2')
+    assert interpreter.eval is original
+    assert Function.__call__ is Function.call is original_call
+
+
+def test_command_line(tmp_path, capsys):
+    program = tmp_path / 'program.dab'
+    program.write_text(PROGRAM)
+    main([str(program), '--memprofile'])
+    out, err = capsys.readouterr()
+    assert out == '265252859812191058636308480000000\n'
+    assert 'factorial' in err
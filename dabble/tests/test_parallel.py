@@ -0,0 +1,94 @@
+"""Tests for pmap, the parallel map pervasive"""
+
+from operator import neg
+
+from pytest import raises
+
+from dabble.environment import Environment
+from dabble.interpreter import pervasives, run
+from dabble.parallel import _portable, _revive, pmap
+
+
+def new_env(**vars):
+    return Environment(vars, parent=pervasives)
+
+
+def test_recursive_function_in_parallel():
+    """The function has to take itself along to recurse, and results have to
+    come back in order."""
+    env = new_env(inputs=list(range(1, 30)))
+    assert run("""
+set factorial
+    fun (x)
+        if (== x 1)
+            1
+            * x (factorial (- x 1))
+
+pmap factorial inputs 4
+    """, env) == [run(f'set f (fun (x) (if (== x 1) 1 (* x (f (- x 1)))))\nf {n}')
+                  for n in range(1, 30)]
+
+
+def test_captured_bindings():
+    env = new_env(inputs=[1, 2, 3])
+    assert run("""
+set make-adder
+    fun (how-much)
+        fun (addend)
+            + addend how-much
+
+pmap (make-adder 100) inputs
+    """, env) == [101, 102, 103]
+
+
+def test_unpicklable_captures_fall_back_to_serial():
+    env = new_env(inputs=[1, 2, 3], host=lambda x: x * 2)
+    assert run('pmap (fun (x) (host x)) inputs 1', env) == [2, 4, 6]
+
+
+def test_unpicklable_results_fall_back_to_serial():
+    """Closures carry their env, pervasives and all, so they can't come back
+    from a worker."""
+    env = new_env(inputs=[1, 2, 3])
+    assert run("""
+set make-adder
+    fun (how-much)
+        fun (addend)
+            + addend how-much
+
+set adders (pmap make-adder inputs 1)
+fold (fun (total adder) (+ total (adder 10))) 0 adders
+    """, env) == 36
+
+
+def test_unpicklable_inputs_fall_back_to_serial():
+    inputs = [lambda: 1, lambda: 2]
+    assert pmap(callable, inputs) == [True, True]
+
+
+def test_native_callables():
+    assert pmap(neg, range(5), chunk_size=2) == [0, -1, -2, -3, -4]
+
+
+def test_non_positive_chunk_sizes_are_refused():
+    for size in ('0', '(- 1)'):
+        with raises(ValueError, match='chunk size must be at least 1'):
+            run(f'pmap (fun (x) x) (range 5) {size}')
+
+
+def test_portable_round_trip_preserves_cycles():
+    env = new_env()
+    run("""
+set ping
+    fun (n)
+        if (== n 0)
+            0
+            pong (- n 1)
+set pong
+    fun (n)
+        ping n
+    """, env)
+    revived = _revive(_portable(env.look_up('ping')))
+    assert revived.call(5) == 0
+    ponged = revived.env.look_up('pong')
+    assert ponged.env.look_up('ping') is revived
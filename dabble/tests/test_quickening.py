@@ -0,0 +1,83 @@
+"""Tests for quickening int arithmetic and comparisons"""
+
+import pickle
+
+from pytest import fixture
+
+from dabble.environment import Environment
+from dabble.indent_parser import lex, parse
+from dabble.interpreter import IntOp, pervasives, run, run_parsed
+
+
+@fixture(autouse=True)
+def fresh_rebound(monkeypatch):
+    """Keep rebindings of pervasives in one test from turning off quickening
+    in others."""
+    monkeypatch.setattr(Environment, 'rebound', set())
+
+
+def test_int_calls_get_quickened():
+    tree = parse(lex('set x 2\n* x (+ x 3)'))
+    assert run_parsed(tree) == 10
+    assert type(tree[1][0]) is IntOp
+    assert type(tree[1][2][0]) is IntOp
+    # And it's still the same tree as far as anyone else can tell:
+    assert tree == [['set', 'x', 2], ['*', 'x', ['+', 'x', 3]]]
+    assert run_parsed(tree) == 10
+
+
+def test_non_int_operands_fall_back():
+    env = Environment({'half': 0.5}, parent=pervasives)
+    assert run("""
+set add
+    fun (a b)
+        + a b
+add 1 2
+add half half
+    """, env) == 1.0
+
+
+def test_unary_minus_is_left_alone():
+    tree = parse(lex('- 3'))
+    assert run_parsed(tree) == -3
+    assert type(tree[0][0]) is str
+
+
+def test_rebinding_in_the_same_program_falls_back():
+    tree = parse(lex('+ 1 2'))
+    assert run_parsed(tree) == 3
+    assert type(tree[0][0]) is IntOp
+    env = Environment({'+': lambda a, b: a * b}, parent=pervasives)
+    assert run_parsed(tree, env) == 2
+
+    # Binding it as a param counts too:
+    assert run('set f (fun (+) (+ 1 3))\nf (fun (a b) (- a b))') == -2
+
+
+def test_rebinding_in_another_program_keeps_quickening():
+    """Say, in an earlier request to the daemon"""
+    run('set plus-was +\nset f (fun (+) (+ 1))\nf (fun (x) x)')
+    env = Environment(parent=pervasives)
+    tree = parse(lex('+ 1 2'))
+    assert run_parsed(tree, env) == 3
+    assert type(tree[0][0]) is IntOp
+    assert not env.tree_rebound and not Environment.rebound
+
+
+def test_rebinding_a_pervasive_falls_back_everywhere():
+    tree = parse(lex('+ 1 2'))
+    assert run_parsed(tree) == 3
+    plus = pervasives.vars['+']
+    pervasives.assign('+', lambda a, b: a * b)
+    try:
+        assert run_parsed(tree) == 2
+    finally:
+        pervasives.vars['+'] = plus
+
+
+def test_quickened_trees_pickle():
+    tree = parse(lex('== 4 4'))
+    run_parsed(tree)
+    restored = pickle.loads(pickle.dumps(tree))
+    assert type(restored[0][0]) is IntOp
+    assert run_parsed(restored) is True
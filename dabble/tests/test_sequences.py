@@ -0,0 +1,41 @@
+"""Tests for lazy sequences"""
+
+from dabble.environment import Environment
+from dabble.interpreter import pervasives, run
+
+
+def test_pipeline():
+    assert run("""
+set square
+    fun (x)
+        * x x
+fold + 0 (map square (filter (fun (x) (> x 2)) (range 6)))
+    """) == 9 + 16 + 25
+
+
+def test_range_forms():
+    assert list(run('range 3')) == [0, 1, 2]
+    assert list(run('range 2 5')) == [2, 3, 4]
+    assert list(run('range 0 10 3')) == [0, 3, 6, 9]
+
+
+def test_huge_chains_stay_lazy():
+    """Nothing past what take asks for should get computed, let alone
+    stored."""
+    assert run('fold + 0 (take 3 (map (fun (x) (* x 2)) (range 1000000000000)))') == 6
+
+
+def test_host_iterables_are_used_without_copying():
+    def numbers():
+        yield 1
+        yield 2
+        raise AssertionError('take should have stopped before here.')
+
+    env = Environment({'numbers': numbers()}, parent=pervasives)
+    assert list(run('take 2 numbers', env)) == [1, 2]
+
+
+def test_native_callbacks():
+    env = Environment({'words': ['a', 'bb', 'ccc'], 'len': len},
+                      parent=pervasives)
+    assert list(run('map len words', env)) == [1, 2, 3]
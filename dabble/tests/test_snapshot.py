@@ -0,0 +1,102 @@
+"""Tests for saving and restoring top-level envs"""
+
+from pytest import raises
+
+from dabble.command import main
+from dabble.environment import Environment
+from dabble.exceptions import SnapshotError
+from dabble.interpreter import pervasives, run
+from dabble.snapshot import MAGIC, restore, save
+
+
+def test_functions_and_cycles_survive(tmp_path):
+    env = Environment(parent=pervasives)
+    run("""
+set factorial
+    fun (x)
+        if (== x 1)
+            1
+            * x (factorial (- x 1))
+set make-adder
+    fun (how-much)
+        fun (addend)
+            + addend how-much
+set add-three (make-adder 3)
+set minus -
+    """, env)
+    path = tmp_path / 'image'
+    save(env, path)
+    restored = restore(path)
+
+    assert run('factorial 5', restored) == 120
+    assert run('add-three 4', restored) == 7
+    assert run('minus 9', restored) == -9
+    # The recursive reference still points at the restored function itself:
+    factorial = restored.look_up('factorial')
+    assert factorial.env is restored
+    # And we land on the live pervasives rather than a copy:
+    assert restored.parent is pervasives
+
+
+def test_shared_structure_survives(tmp_path):
+    env = Environment(parent=pervasives)
+    run('set f (fun (x) x)\nset g f', env)
+    save(env, tmp_path / 'image')
+    restored = restore(tmp_path / 'image')
+    assert restored.look_up('f') is restored.look_up('g')
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / 'image'
+    path.write_bytes(b'nope')
+    with raises(SnapshotError):
+        restore(path)
+
+
+def test_unsavable_vars_are_named_and_leave_old_snapshots_alone(tmp_path):
+    path = tmp_path / 'image'
+    good = Environment(parent=pervasives)
+    run('set x 1', good)
+    save(good, path)
+    before = path.read_bytes()
+
+    env = Environment(parent=pervasives)
+    run('set s (map (fun (x) x) (range 3))', env)
+    with raises(SnapshotError, match='"s"'):
+        save(env, path)
+    with raises(SnapshotError, match='"host"'):
+        save(Environment({'host': lambda x: x}, parent=pervasives), path)
+    assert path.read_bytes() == before
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_truncated_snapshot(tmp_path):
+    env = Environment(parent=pervasives)
+    run('set f (fun (x) x)', env)
+    path = tmp_path / 'image'
+    save(env, path)
+    path.write_bytes(path.read_bytes()[:-10])
+    with raises(SnapshotError):
+        restore(path)
+    path.write_bytes(MAGIC)
+    with raises(SnapshotError):
+        restore(path)
+
+
+def test_command_line(tmp_path, capsys):
+    setup = tmp_path / 'setup.dab'
+    setup.write_text('set square\n    fun (x)\n        * x x\n0\n')
+    request = tmp_path / 'request.dab'
+    request.write_text('square 12\n')
+    image = str(tmp_path / 'image')
+
+    main([str(setup), '--save-snapshot', image])
+    main([str(request), '--from-snapshot', image])
+    assert capsys.readouterr().out == '0\n144\n'
+
+
+def test_command_line_reports_unsavable_vars(tmp_path):
+    program = tmp_path / 'program.dab'
+    program.write_text('set s (range 3)\nset t (map (fun (x) x) s)\n0\n')
+    with raises(SystemExit, match='"t"'):
+        main([str(program), '--save-snapshot', str(tmp_path / 'image')])
@@ -0,0 +1,219 @@
+"""Tests for the Dabble-to-Python transpiler
+
+Most of these are differential, run both ways. So are the interpreter's own
+tests; see the ``backend`` fixture in conftest.
+
+"""
+from importlib import import_module
+import sys
+
+from pytest import raises
+
+from dabble import interpreter, transpiler
+from dabble.command import main
+from dabble.environment import Environment
+from dabble.exceptions import TranspileError
+from dabble.interpreter import Function, pervasives
+from dabble.transpiler import load, mangle, module_name, run, transpile
+
+from .testing import assert_transpiles_faithfully
+
+
+def test_statements_in_args_keep_evaluation_order():
+    """A `while` in an arg has to become statements, but the args to its left
+    must still see the values from before it ran."""
+    assert assert_transpiles_faithfully("""
+set n 0
++ n (begin (while (< n 3) (set n (+ n 1))) n)
+    """) == 3
+
+
+def test_while_in_condition():
+    assert assert_transpiles_faithfully("""
+set n 0
+set m 0
+while (< (begin (while (< m 2) (set m (+ m 1))) n) 4)
+    set n (+ n m)
+n
+    """) == 4
+
+
+def test_if_with_statements_in_branches():
+    assert assert_transpiles_faithfully("""
+set up
+    fun (x)
+        if (> x 0)
+            begin
+                set n 1
+                while (< n x)
+                    set n (+ n 1)
+                n
+            - 0 1
++ (up 5) (up 0)
+    """) == 4
+
+
+def test_read_before_set_is_refused_and_falls_back():
+    """A function reading the outer binding of a var it later sets itself
+    can't be expressed with Python locals."""
+    program = """
+set x 8
+set frob
+    fun ()
+        begin
+            set x (+ x 1)
+            x
+(frob)
+    """
+    with raises(TranspileError):
+        transpile(program)
+    assert run(program) == 9
+
+
+def test_set_in_only_one_branch_is_refused():
+    with raises(TranspileError):
+        transpile("""
+set x 1
+set frob
+    fun (c)
+        begin
+            if c (set x 2) 0
+            x
+        """)
+
+
+def test_closure_reading_a_var_its_encloser_sets_later_is_refused():
+    """Till the enclosing function sets it, Dabble finds the outer binding,
+    but Python finds the closure cell empty."""
+    for program in ["""
+set x 1
+set outer
+    fun ()
+        begin
+            set inner (fun () x)
+            set y (inner)
+            set x 2
+            y
+(outer)
+    """, """
+set x 1
+set outer
+    fun ()
+        begin
+            if false (set x 2) 0
+            set inner (fun () x)
+            (inner)
+(outer)
+    """]:
+        with raises(TranspileError):
+            transpile(program)
+        assert run(program) == 1
+
+
+def test_closure_reading_a_var_its_encloser_already_set():
+    assert assert_transpiles_faithfully("""
+set x 1
+set outer
+    fun ()
+        begin
+            set x 2
+            set inner (fun () x)
+            (inner)
+(outer)
+    """) == 2
+
+
+def test_env_is_read_and_written():
+    """Like interpreter.run(), the generated program should see and update the
+    env it's handed."""
+    env = Environment({'seed': 5}, parent=pervasives)
+    assert run('set x (+ seed 1)\n* x 2', env) == 12
+    assert env.look_up('x') == 6
+
+
+def test_extra_args_are_ignored():
+    assert assert_transpiles_faithfully('set f (fun (x) x)\nf 1 2') == 1
+    assert assert_transpiles_faithfully('set f (fun () 3)\nf 1') == 3
+
+
+def test_missing_args_leave_params_unbound():
+    """Reading one finds a var of the same name further out."""
+    assert assert_transpiles_faithfully('set y 5\nset f (fun (x y) y)\nf 1') == 5
+    assert assert_transpiles_faithfully("""
+set f
+    fun (x y)
+        begin
+            set y (+ x 1)
+            y
+f 1
+    """) == 2
+    assert assert_transpiles_faithfully("""
+set y 5
+set f
+    fun (x y)
+        fun () y
+set g (f 1)
+(g)
+    """) == 5
+    with raises(Exception, match='"y" is not defined'):
+        load('set f (fun (x y) y)\nf 1')(Environment(parent=pervasives))
+
+
+def test_only_sets_that_ran_reach_the_env():
+    """A top-level var that's only read, or set on a path not taken, must
+    come out of the env just as it went in."""
+    f = Function(['x'], 'x', pervasives)
+    env = Environment({'f': f}, parent=pervasives)
+    assert run('set r (f 3)\nif false (set f 1) 0\nr', env) == 3
+    assert env.vars['f'] is f
+
+    env = Environment(parent=pervasives)
+    run('set a (+ 1 2)\nif false (set + 1) 0', env)
+    assert '+' not in env.vars
+    assert not env.tree_rebound
+
+
+def test_functions_see_later_changes_to_top_level_vars():
+    env = Environment(parent=pervasives)
+    run('set k 1\nset f (fun () k)', env)
+    assert interpreter.run('set k 2\n(f)', env) == 2
+
+
+def test_undefined_var_raises():
+    with raises(Exception):
+        load('+ nope 1')(Environment(parent=pervasives))
+
+
+def test_mangling_is_one_to_one():
+    assert mangle('make-adder') == 'd_make_2d_adder'
+    assert mangle('a_2d_b') != mangle('a-b')
+
+
+def test_disk_cache_makes_importable_modules(tmp_path):
+    program = 'set a 3\n* a a'
+    assert run(program, cache_dir=str(tmp_path)) == 9
+    name = module_name(program)
+    assert (tmp_path / f'{name}.py').exists()
+    assert run(program, cache_dir=str(tmp_path)) == 9
+
+    sys.path.insert(0, str(tmp_path))
+    try:
+        module = import_module(name)
+    finally:
+        sys.path.remove(str(tmp_path))
+    assert module.program(Environment(parent=pervasives)) == 9
+
+
+def test_command_line(tmp_path, capsys, monkeypatch):
+    loaded = []
+    monkeypatch.setattr(transpiler, 'load',
+                        lambda *args, **kwargs: loaded.append(args) or load(*args, **kwargs))
+    program = tmp_path / 'program.dab'
+    program.write_text('set a 3\n* a a\n')
+    main([str(program), '--transpile', '--no-daemon'])
+    cache = tmp_path / 'cache'
+    main([str(program), '--transpile-cache', str(cache)])
+    main([str(program), '--transpile-cache', str(cache)])
+    assert capsys.readouterr().out == '9\n9\n9\n'
+    assert len(loaded) == 3
+    assert (cache / f'{module_name(program.read_text())}.py').exists()
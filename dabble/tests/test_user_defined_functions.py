@@ -1,6 +1,12 @@
+from pytest import mark
+
 from dabble.interpreter import run
 
 
+# Check the transpiler against everything here too:
+pytestmark = mark.usefixtures('backend')
+
+
 def test_first_class_lambda():
     assert run("""
 set on-click
@@ -1,4 +1,8 @@
+from pytest import raises
+
+from dabble import interpreter, transpiler
 from dabble.environment import Environment
+from dabble.indent_parser import lex, parse
 from dabble.interpreter import eval, pervasives
 
 
@@ -6,3 +10,51 @@ def eval_with_new_env(exp):
     """Evaluate a single expression in a top-level evaluator with just
     pervasives."""
     return eval(exp, Environment(parent=pervasives))
+
+
+def assert_transpiles_faithfully(program):
+    """Run a program under both the interpreter and the transpiler, without
+    falling back, and make sure they agree. Return the result."""
+    expected = interpreter.run(program)
+    assert transpiler.load(program)(Environment(parent=pervasives)) == expected
+    return expected
+
+
+def run_both_ways(program, env=None):
+    """Stand in for ``interpreter.run()``, but run the program transpiled too,
+    and make sure the two agree. Return the transpiled result."""
+    return _both_ways(parse(lex(program)), env, lambda env: interpreter.run(program, env))
+
+
+def eval_both_ways(exp, env):
+    """Stand in for ``interpreter.eval()`` as ``run_both_ways()`` does for
+    ``run()``."""
+    return _both_ways([exp], env, lambda env: interpreter.eval(exp, env))
+
+
+def eval_with_new_env_both_ways(exp):
+    return eval_both_ways(exp, Environment(parent=pervasives))
+
+
+def _both_ways(expressions, env, interpret):
+    """Interpret a program in a copy of an env, and run it transpiled in the
+    env itself. Make sure they return the same or both raise."""
+    if env is None:
+        env = Environment(parent=pervasives)
+    # Transpile first, so we see the tree as written, not quickened:
+    program = transpiler.load_parsed(expressions)
+    copy = Environment(dict(env.vars), parent=env.parent)
+    try:
+        expected = interpret(copy)
+    except Exception:
+        with raises(Exception):
+            program(env)
+        raise
+    result = program(env)
+    assert result == expected
+    # Functions come out as different types, but they should land in the
+    # same places:
+    assert env.vars.keys() == copy.vars.keys()
+    assert ({k: v for k, v in env.vars.items() if not callable(v)} ==
+            {k: v for k, v in copy.vars.items() if not callable(v)})
+    return result
@@ -0,0 +1,420 @@
+"""An ahead-of-time backend that translates Dabble into Python source
+
+The generated module defines a single function, ``program(env)``, which does
+what ``interpreter.run()`` does with the same program and env: it returns the
+value of the last top-level expression and leaves top-level ``set``s behind in
+``env``.
+
+Dabble's function scoping maps straight onto Python's: a ``set`` inside a
+``fun`` binds a local of the generated ``def``, and reads of anything else close
+over the enclosing scopes. The one place they differ is a function that reads a
+var before setting it itself; Dabble finds the outer binding, whereas Python
+would raise UnboundLocalError. We refuse to translate those (README calls them
+an error-to-be anyway), and ``run()`` falls back to the interpreter.
+
+Functions read top-level vars from the env each time, so they see the changes
+made by later programs run in the same env. The exception is pervasives, which
+they treat as constants: a function keeps seeing a pervasive's value from
+when its program started, even if a later program rebinds it.
+
+Calls match the interpreter's too. Extra args are ignored. Missing ones leave
+their params unbound, so reading one looks further out, which the generated
+code does by giving params a sentinel default and checking for it.
+
+"""
+from hashlib import sha256
+from importlib.util import module_from_spec, spec_from_file_location
+from itertools import count
+from os import makedirs, replace
+from os.path import exists, join
+from tempfile import mkstemp
+
+from . import interpreter
+from .environment import Environment
+from .exceptions import TranspileError
+from .indent_parser import lex, parse
+from .interpreter import is_number, is_string, is_variable_name, pervasives
+
+
+# Bump this whenever the shape of generated code changes so stale files in an
+# on-disk cache are ignored.
+FORMAT_VERSION = 6
+
+INDENT = '    '
+
+
+def run(program, env=None, cache_dir=None):
+    """Evaluate a string containing a Dabble program by way of Python.
+
+    Programs we can't translate faithfully are handed to the interpreter
+    instead, so this is a drop-in replacement for ``interpreter.run()``.
+
+    :arg cache_dir: A directory to keep generated modules in, keyed by the hash
+        of the program. Python keeps their bytecode in ``__pycache__`` there as
+        usual.
+
+    """
+    if env is None:
+        env = Environment(parent=pervasives)
+    try:
+        program_fn = load(program, cache_dir=cache_dir)
+    except TranspileError:
+        return interpreter.run(program, env)
+    return program_fn(env)
+
+
+def load(program, cache_dir=None):
+    """Return the ``program(env)`` function translated from some Dabble source.
+
+    :raise TranspileError: if the program can't be translated faithfully
+
+    """
+    if cache_dir is None:
+        return load_parsed(parse(lex(program)))
+
+    name = module_name(program)
+    path = join(cache_dir, name + '.py')
+    if not exists(path):
+        source = transpile(program)
+        makedirs(cache_dir, exist_ok=True)
+        # Write then rename so a concurrent loader never sees half a module.
+        # The temp file is ours alone, even among processes:
+        fd, temp_path = mkstemp(suffix='.tmp', dir=cache_dir)
+        with open(fd, 'w') as file:
+            file.write(source)
+        replace(temp_path, path)
+    spec = spec_from_file_location(name, path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.program
+
+
+def load_parsed(expressions):
+    """Return the ``program(env)`` function translated from a list of parsed
+    top-level Dabble expressions.
+
+    :raise TranspileError: if the program can't be translated faithfully
+
+    """
+    namespace = {}
+    exec(compile(transpile_parsed(expressions), '<dabble>', 'exec'), namespace)
+    return namespace['program']
+
+
+def module_name(program):
+    """Return the name a program's generated module goes by in a cache dir.
+
+    With the cache dir on ``sys.path``, ``import`` it by this name.
+
+    """
+    digest = sha256(f'{FORMAT_VERSION}\0{program}'.encode()).hexdigest()
+    return f'dabble_{digest[:32]}'
+
+
+def transpile(program):
+    """Return the source of a Python module equivalent to a Dabble program."""
+    return transpile_parsed(parse(lex(program)))
+
+
+def transpile_parsed(expressions):
+    """Return the source of a Python module equivalent to a list of parsed
+    top-level Dabble expressions."""
+    return _Compiler().module(expressions)
+
+
+def mangle(name):
+    """Turn a Dabble var name into a Python identifier, one-to-one.
+
+    Everything but ASCII letters and digits is escaped as its hex code point, so
+    ``make-adder`` becomes ``d_make_2d_adder``. The prefix keeps us clear of
+    Python keywords and the names generated code uses for itself.
+
+    """
+    return 'd_' + ''.join(c if c.isascii() and c.isalnum() else f'_{ord(c):x}_'
+                          for c in name)
+
+
+def _assigned_names(exp):
+    """Return the names a function body ``set``s in its own scope, not counting
+    those set inside nested functions."""
+    if not isinstance(exp, list) or not exp:
+        return set()
+    verb = exp[0]
+    if verb == 'fun':
+        return set()
+    if verb == 'set':
+        if len(exp) != 3 or not is_variable_name(exp[1]):
+            raise TranspileError(f'Malformed set: {exp}')
+        return {exp[1]} | _assigned_names(exp[2])
+    names = set()
+    for e in exp:
+        names |= _assigned_names(e)
+    return names
+
+
+class _Scope:
+    """Bookkeeping for the function (or top level) we're generating code for"""
+
+    def __init__(self, params, body, parent=None):
+        #: The scope of the enclosing function or top level, if any
+        self.parent = parent
+        self.is_top_level = parent is None
+        self.params = set(params)
+        # Names that are locals of the generated function:
+        self.assigned = _assigned_names(body) | self.params
+        # Names certain to be bound at the point in the body we've reached.
+        # Params aren't, since a call can pass too few args.
+        self.definitely_assigned = set()
+
+
+class _Compiler:
+    """A single-use translator of one program to Python source
+
+    Dabble is all expressions, but ``while`` and ``fun`` have to become Python
+    statements. So compiling an expression emits whatever statements it needs
+    into ``lines`` and returns a Python expression for its value.
+
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.depth = 0
+        self.scope = None
+        self._counter = count()
+        # Names read by the top level, or pervasives read by any function,
+        # that the top level fetches from the env on the way in
+        self.free = set()
+
+    def module(self, expressions):
+        body = ['begin', *expressions]
+        self.scope = _Scope([], body)
+        self.depth = 1
+        result = self.expression(body)
+
+        out = ['"""Generated by dabble.transpiler. Do not edit."""',
+               '',
+               '# The value of a param not passed an arg:',
+               '_MISSING = object()',
+               '',
+               '',
+               'def program(env):']
+        # Bind everything we read from outside, pervasives included, as fast
+        # locals. Leave unbound what the env lacks, so reading it fails as it
+        # does in the interpreter.
+        for name in sorted(self.free):
+            out += [f'{INDENT}try:',
+                    f'{INDENT * 2}{mangle(name)} = env.look_up({name!r})',
+                    f'{INDENT}except Exception:',
+                    f'{INDENT * 2}pass']
+        out += self.lines
+        out += [f'{INDENT}return {result}',
+                '']
+        return '\n'.join(out)
+
+    def emit(self, line, extra_depth=0):
+        self.lines.append(INDENT * (self.depth + extra_depth) + line)
+
+    def temp(self, prefix='_t'):
+        """Return a fresh name for an intermediate value."""
+        return f'{prefix}{next(self._counter)}'
+
+    def capture(self, exp):
+        """Compile an expression one block deeper than we are, returning the
+        statements it needs separately rather than emitting them."""
+        outer_lines, self.lines = self.lines, []
+        self.depth += 1
+        try:
+            code = self.expression(exp)
+        finally:
+            self.depth -= 1
+            captured, self.lines = self.lines, outer_lines
+        return captured, code
+
+    def statement(self, exp):
+        """Compile an expression whose value is thrown away."""
+        if isinstance(exp, list) and exp and exp[0] == 'set':
+            name, code = self._set(exp)
+            self.emit(f'{mangle(name)} = {code}')
+        else:
+            code = self.expression(exp)
+            if not _is_stable(code):
+                self.emit(code)
+
+    def expression(self, exp):
+        if is_number(exp):
+            return repr(exp)
+
+        if is_string(exp):
+            return repr(exp[1:-1])
+
+        if is_variable_name(exp):
+            return self._read(exp)
+
+        if not isinstance(exp, list) or not exp:
+            raise TranspileError(f'Unimplemented: {exp}')
+
+        verb = exp[0]
+
+        if verb == 'begin':
+            *init, last = exp[1:] or [None]
+            for e in init:
+                self.statement(e)
+            return 'None' if last is None else self.expression(last)
+
+        if verb == 'set':
+            name, code = self._set(exp)
+            return f'({mangle(name)} := {code})'
+
+        if verb == 'if':
+            return self._if(exp)
+
+        if verb == 'while':
+            return self._while(exp)
+
+        if verb == 'fun':
+            return self._fun(exp)
+
+        return self._call(exp)
+
+    def _read(self, name):
+        """Return the code for reading a var."""
+        scope = self.scope
+        if scope.is_top_level:
+            self.free.add(name)
+            return mangle(name)
+        return self._read_from(scope, name)
+
+    def _read_from(self, scope, name):
+        """Return the code for reading, from within a function, a var bound in
+        it or in a function or top level enclosing it, starting the search at
+        `scope`."""
+        # Python will look in the enclosing functions, as Dabble does. But if
+        # one of them binds the var only later, Python sees it unbound till
+        # then, where Dabble would look further out. (For closures, later
+        # means after they're made, since they can be called any time after.)
+        while not scope.is_top_level:
+            if name in scope.assigned:
+                if name in scope.definitely_assigned:
+                    return mangle(name)
+                if name in scope.params:
+                    # Given too few args, Dabble leaves the param unbound, so
+                    # reading it looks further out:
+                    return (f'({mangle(name)} if {mangle(name)} is not _MISSING '
+                            f'else {self._read_from(scope.parent, name)})')
+                raise TranspileError(f'"{name}" may be read before its function sets it, which Python scoping can\'t express.')
+            scope = scope.parent
+        # It's a top-level var. A function can outlive the program, and later
+        # ones run in the same env can change those, so look it up afresh.
+        # Pervasives we treat as constants, for speed:
+        if name in pervasives.vars and name not in scope.assigned:
+            self.free.add(name)
+            return mangle(name)
+        return f'env.look_up({name!r})'
+
+    def _set(self, exp):
+        """Compile the value of a ``set``, and return it along with the name
+        it's bound to."""
+        _, name, value = exp
+        code = self.expression(value)
+        # Only now, since the value may read the outer binding:
+        self.scope.definitely_assigned.add(name)
+        if self.scope.is_top_level:
+            # Write top-level vars through to the env as they're set, so it
+            # ends up with just the ones whose sets ran, as in the interpreter:
+            code = f'env.assign({name!r}, {code})'
+        return name, code
+
+    def _if(self, exp):
+        if len(exp) != 4:
+            raise TranspileError(f'Malformed if: {exp}')
+        _, condition, consequent, alternate = exp
+        condition_code = self.expression(condition)
+
+        before = self.scope.definitely_assigned
+        self.scope.definitely_assigned = set(before)
+        consequent_lines, consequent_code = self.capture(consequent)
+        after_consequent = self.scope.definitely_assigned
+        self.scope.definitely_assigned = set(before)
+        alternate_lines, alternate_code = self.capture(alternate)
+        self.scope.definitely_assigned &= after_consequent
+
+        if not consequent_lines and not alternate_lines:
+            return f'({consequent_code} if {condition_code} else {alternate_code})'
+        result = self.temp()
+        self.emit(f'if {condition_code}:')
+        self.lines += consequent_lines
+        self.emit(f'{result} = {consequent_code}', 1)
+        self.emit('else:')
+        self.lines += alternate_lines
+        self.emit(f'{result} = {alternate_code}', 1)
+        return result
+
+    def _while(self, exp):
+        if len(exp) != 3:
+            raise TranspileError(f'Malformed while: {exp}')
+        _, condition, body = exp
+        result = self.temp()
+        self.emit(f'{result} = None')
+        condition_lines, condition_code = self.capture(condition)
+        # We require condition to be true, not just truthy:
+        if condition_lines:
+            self.emit('while True:')
+            self.lines += condition_lines
+            self.emit(f'if not ({condition_code} == True):', 1)
+            self.emit('break', 2)
+        else:
+            self.emit(f'while {condition_code} == True:')
+
+        # The body may run no times, so nothing it sets is certain afterward:
+        after_condition = set(self.scope.definitely_assigned)
+        body_lines, body_code = self.capture(body)
+        self.scope.definitely_assigned = after_condition
+        self.lines += body_lines
+        self.emit(f'{result} = {body_code}', 1)
+        return result
+
+    def _fun(self, exp):
+        if len(exp) != 3:
+            raise TranspileError(f'Malformed fun: {exp}')
+        _, params, body = exp
+        if (not isinstance(params, list) or
+                not all(is_variable_name(p) for p in params) or
+                len(set(params)) != len(params)):
+            raise TranspileError(f'Unsupported params: {params}')
+        name = self.temp('_f')
+        # Like the interpreter, ignore extra args and tolerate missing ones:
+        self.emit(f'def {name}({"".join(mangle(p) + "=_MISSING, " for p in params)}*_):')
+        outer_scope, self.scope = self.scope, _Scope(params, body, self.scope)
+        self.depth += 1
+        try:
+            self.emit(f'return {self.expression(body)}')
+        finally:
+            self.depth -= 1
+            self.scope = outer_scope
+        return name
+
+    def _call(self, exp):
+        codes = []
+        for e in exp:
+            mark = len(self.lines)
+            code = self.expression(e)
+            if len(self.lines) > mark:
+                # That arg needed statements, which would run before the args
+                # to its left got evaluated. Evaluate those first into temps.
+                spills = []
+                for i, earlier in enumerate(codes):
+                    if not _is_stable(earlier):
+                        codes[i] = self.temp()
+                        spills.append(f'{INDENT * self.depth}{codes[i]} = {earlier}')
+                self.lines[mark:mark] = spills
+            codes.append(code)
+        fn, *args = codes
+        return f'{fn}({", ".join(args)})'
+
+
+def _is_stable(code):
+    """Return whether a generated expression is a literal or a name bound only
+    once, so evaluating it later gives the same value and has no effect."""
+    return (code.startswith(('_t', '_f', "'", '"')) or
+            code in ('None', 'True', 'False') or
+            code.lstrip('-').isdigit())